@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+from gating import CpuMeter
+
+
+class QualityLevel:
+    __slots__ = ('index', 'input_size', 'detect_interval', 'max_fps')
+
+    def __init__(self, index, input_size, detect_interval, max_fps):
+        self.index = index
+        self.input_size = tuple(input_size)
+        self.detect_interval = detect_interval
+        self.max_fps = max_fps
+
+    def __repr__(self):
+        return (f"уровень {self.index}: вход {self.input_size[0]}x{self.input_size[1]}, "
+                f"детекция раз в {self.detect_interval} кадр., анализ до {self.max_fps} fps")
+
+
+class AdaptiveController:
+    """Подстройка качества анализа под бюджет задержки и загрузку машины
+
+    Уровни упорядочены от лучшего к самому дешевому: каждый следующий
+    уменьшает вход детектора, реже запускает полную детекцию и ограничивает
+    частоту анализа. Раз в interval секунд контроллер смотрит на возраст
+    результата к моменту публикации (p90: от захвата кадра до готового
+    анализа), частоту вывода и запас CPU и сдвигается на один
+    уровень вниз, если бюджет нарушен, или вверх, если запас большой.
+    После смены уровень держится не меньше hold секунд.
+
+    Размер лица ограничивает только вход детектора: самое мелкое из
+    недавних лиц должно оставаться на входе не меньше min_face_px пикселей,
+    поэтому уровень может идти с входом одного из лучших уровней. Частота
+    детекции и анализа от размера лица не зависят. Пока лиц нет, действует
+    прошлая оценка размера (до первого лица - default_face_fraction).
+    """
+
+    def __init__(self, levels, target_age_ms=150.0, target_fps=30.0, min_headroom=0.1,
+                 min_face_px=40, default_face_fraction=0.15, interval=1.0, hold=3.0):
+        self.levels = levels
+        self.target_age_ms = target_age_ms
+        self.target_fps = target_fps
+        self.min_headroom = min_headroom
+        self.min_face_px = min_face_px
+        self.default_face_fraction = default_face_fraction
+        self.interval = interval
+        self.hold = hold
+
+        self.level = levels[0]
+        self.cpu = CpuMeter()
+        self.cores = os.cpu_count() or 1
+        self._ages = []
+        self._frames = 0
+        self._face_fraction = None
+        # Доля ширины кадра для самого мелкого лица, по которой ограничен вход
+        self.face_fraction = default_face_fraction
+        self._last_update = time.monotonic()
+        self._last_change = 0.0
+
+        # Последние измерения, по которым принималось решение
+        self.age_ms = 0.0
+        self.display_fps = 0.0
+        self.headroom = 1.0
+        self.reason = "старт"
+
+    @classmethod
+    def from_config(cls, adaptive):
+        levels = [QualityLevel(i, size, interval, fps) for i, (size, interval, fps) in
+                  enumerate(zip(adaptive['input_sizes'], adaptive['detect_intervals'],
+                                adaptive['max_fps']))]
+        return cls(levels, target_age_ms=adaptive['target_age_ms'],
+                   target_fps=adaptive['target_fps'], min_headroom=adaptive['min_headroom'],
+                   min_face_px=adaptive['min_face_px'],
+                   default_face_fraction=adaptive['default_face_fraction'],
+                   interval=adaptive['interval'], hold=adaptive['hold'])
+
+    def observe_result(self, age_ms):
+        """Возраст результата в момент публикации (поток анализа)"""
+        self._ages.append(age_ms)
+
+    def observe_frame(self, face_width=None, frame_width=None):
+        """Очередной кадр камеры и ширина найденного лица, если есть"""
+        self._frames += 1
+        if face_width and frame_width:
+            fraction = face_width / frame_width
+            if self._face_fraction is None or fraction < self._face_fraction:
+                self._face_fraction = fraction
+
+    def _compose(self, index):
+        # Вход детектора - самый дешевый из уровней 0..index, на котором мелкое
+        # лицо еще различимо; частоты - самого уровня index
+        allowed = 0
+        for level in self.levels[:index + 1]:
+            if level.input_size[0] * self.face_fraction >= self.min_face_px:
+                allowed = level.index
+        level = self.levels[index]
+        return QualityLevel(index, self.levels[allowed].input_size, level.detect_interval,
+                            level.max_fps)
+
+    def update(self, now, display_fps):
+        """Раз в interval секунд пересмотреть уровень; True, если он сменился"""
+        if now - self._last_update < self.interval or not self._frames:
+            return False
+
+        # Камера может сама давать меньше target_fps, тогда цель - ее частота
+        target_fps = min(self.target_fps, self._frames / (now - self._last_update))
+        ages, self._ages = sorted(self._ages), []
+        # Без новых результатов (простой) бюджет задержки не нарушен
+        self.age_ms = ages[int(0.9 * (len(ages) - 1))] if ages else 0.0
+        self.display_fps = display_fps
+        self.headroom = 1.0 - self.cpu.percent() / (100.0 * self.cores)
+        if self._face_fraction is not None:
+            self.face_fraction = self._face_fraction
+        self._frames = 0
+        self._face_fraction = None
+        self._last_update = now
+        self.cpu.reset()
+
+        index = self.level.index
+        reason = "размер лица"
+        if now - self._last_change < self.hold:
+            pass
+        elif (self.age_ms > self.target_age_ms or display_fps < 0.9 * target_fps
+              or self.headroom < self.min_headroom):
+            if index < len(self.levels) - 1:
+                index += 1
+                reason = (f"возраст {self.age_ms:.0f} мс, вывод {display_fps:.0f} fps, "
+                          f"запас CPU {100 * self.headroom:.0f}%")
+        elif (self.age_ms < 0.6 * self.target_age_ms and display_fps >= 0.95 * target_fps
+              and self.headroom > 2 * self.min_headroom and index > 0):
+            index -= 1
+            reason = "есть запас"
+
+        # Вход детектора по размеру лица меняется сразу, без выдержки hold
+        level = self._compose(index)
+        if index == self.level.index and level.input_size == self.level.input_size:
+            return False
+        if index != self.level.index:
+            self._last_change = now
+        self.level = level
+        self.reason = reason
+        return True
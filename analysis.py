@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import cv2
+
+from metrics import NULL_METRICS
+from pipeline import AnalysisResult, FaceResult
+
+
+class FrameAnalyzer:
+    """Анализ кадра BGR без окна: трекер, детектор, классификатор, номера игроков
+
+    Одно ядро для игры (app.py) и покадрового прогона конвейера
+    (benchmarks/bench_pipeline.py). engine - EmotionEngine или RemoteEngine,
+    translate(probabilities) - название эмоции по вероятностям. Этапы
+    tracking, detection и classification пишутся в metrics.
+    """
+
+    def __init__(self, engine, translate, tracker=None, players=None, metrics=NULL_METRICS):
+        self.engine = engine
+        self.translate = translate
+        self.tracker = tracker
+        self.players = players
+        self.metrics = metrics
+
+    def analyze(self, frame, multi_face=False):
+        """Эмоция и область лица в координатах кадра"""
+        if not self.engine.ready.is_set():
+            return AnalysisResult()
+
+        if multi_face:
+            return self._analyze_players(frame)
+
+        gray = None
+        region = None
+
+        # Между полными детекциями область лица переносит трекер
+        metrics = self.metrics
+        tracker = self.tracker
+        if tracker:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if not tracker.needs_detection():
+                started = metrics.start()
+                region = tracker.update(gray)
+                metrics.observe('tracking', started)
+
+        if region is None:
+            started = metrics.start()
+            boxes, scores = self.engine.detect(frame)
+            metrics.observe('detection', started)
+            if not len(boxes):
+                if tracker:
+                    tracker.clear()
+                return AnalysisResult()
+            region = tuple(int(v) for v in boxes[0])
+            if tracker:
+                tracker.reset(gray, region)
+
+        # На классификацию идет только вырезанное лицо
+        try:
+            started = metrics.start()
+            probabilities = self.engine.classify_regions(frame, [region])[0]
+            metrics.observe('classification', started)
+        except Exception as e:
+            if tracker:
+                tracker.clear()
+            return AnalysisResult()
+
+        return AnalysisResult(self.translate(probabilities), region, probabilities)
+
+    def _analyze_players(self, frame):
+        # Все лица кадра классифицируются одним батчем
+        metrics = self.metrics
+        started = metrics.start()
+        boxes, scores = self.engine.detect(frame)
+        metrics.observe('detection', started)
+        boxes = boxes[:self.players.max_players]
+        try:
+            started = metrics.start()
+            probabilities = self.engine.classify_regions(frame, boxes)
+            metrics.observe('classification', started)
+        except Exception as e:
+            return AnalysisResult()
+        return self.build_result(frame, boxes, probabilities, multi_face=True)
+
+    def build_result(self, frame, boxes, probabilities, multi_face=False):
+        """Результат анализа по найденным рамкам и вероятностям эмоций"""
+        if not len(boxes):
+            return AnalysisResult()
+
+        if not multi_face:
+            region = tuple(int(v) for v in boxes[0])
+            return AnalysisResult(self.translate(probabilities[0]), region, probabilities[0])
+
+        # Номера игроков сохраняются между кадрами
+        players = self.players.assign(boxes, frame.shape[1])
+        faces = sorted((FaceResult(int(player), self.translate(probs),
+                                   tuple(int(v) for v in box), probs)
+                        for player, box, probs in zip(players, boxes, probabilities)
+                        if player >= 0),
+                       key=lambda face: face.player)
+        if not faces:
+            return AnalysisResult()
+        first = faces[0]
+        return AnalysisResult(first.emotion, first.region, first.probabilities, faces)
@@ -1,21 +1,64 @@
 # -*- coding: utf-8 -*-
-import cv2
-import numpy as np
-from deepface import DeepFace
+import sys
+
+import importtime
+
+# Отчет о времени импорта включается до загрузки остальных модулей
+if '--import-report' in sys.argv:
+    importtime.enable()
+
 import time
 import random
 import threading
-import queue
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk, ImageFont, ImageDraw
-import sys
-import os
+from PIL import Image, ImageTk
+import json
+
+from adaptive import AdaptiveController
+from analysis import FrameAnalyzer
+from capture import CameraCapture
+from classifier import EMOTION_LABELS, EMOTION_NAMES
+from config import load_config
+from display import FrameDisplay
+from engine import EmotionEngine
+from games import GameScheduler
+from gating import CpuMeter, FrameGate
+from metrics import NULL_METRICS, CsvExporter, Metrics, MetricsServer, hud_lines, interval_stats
+from pipeline import AnalysisResult, InferenceStage, ResultNotifier
+from overlay import OverlayRenderer, render_game_overlay
+from players import PlayerAssigner
+from quest_assets import SceneImageCache
+from quest_graph import NO_SCENE, QUESTS_DIR, UNFINISHED_TEXT, QuestLibrary, label_ids
+from recording import (InferenceCache, SessionRecorder, SessionReplay, analysis_fingerprint,
+                       cache_key, frame_digest)
+from smoothing import EmotionSmoother
+from streaming import StreamServer
+from tracker import FaceTracker
+from worker import RemoteEngine, WorkerError
 
 
 class NeoFlexEmotionGame:
-    def __init__(self, root):
+    # Максимальное ожидание результата анализа в игровых режимах, секунды
+    RESULT_WAIT = 0.5
+
+    def __init__(self, root, config=None, engine=None, scheduler=None, source=0, on_exit=None):
         self.root = root
+        self.on_exit = on_exit
+        self.config = config or load_config(None)
+        self.startup_started = time.monotonic()
+        # Время от запуска до первого кадра и первого анализа, мс
+        self.startup_metrics = {}
+
+        # Время этапов горячего пути; выключенные метрики ничего не стоят
+        metrics = self.config['metrics']
+        self.metrics = Metrics() if metrics['enabled'] else NULL_METRICS
+        self.hud_visible = metrics['enabled'] and metrics['hud']
+        self.hud_lines = []
+        self._hud_snapshot = None
+        self._hud_updated = 0.0
+        self.latency_text = ""
+        self._latency_updated = 0.0
         self.root.title("NeoFlex Emotion AI")
         self.root.geometry("1200x800")
 
@@ -46,26 +89,119 @@ class NeoFlexEmotionGame:
             'button': ('Arial', 14, 'bold')
         }
 
+        # Шрифт и палитра для надписей на видео разрешаются один раз
+        self.overlay = OverlayRenderer(self.COLORS, font_size=24)
+
         # Инициализация параметров
         self.emotions_list = ['злость', 'страх', 'радость', 'грусть', 'удивление', 'нейтральность']
-        self.emotion_translations = {
-            'angry': 'злость',
-            'fear': 'страх',
-            'happy': 'радость',
-            'sad': 'грусть',
-            'surprise': 'удивление',
-            'neutral': 'нейтральность'
-        }
-
-        self.cap = cv2.VideoCapture(0)
+        self.emotion_translations = dict(EMOTION_NAMES)
+
+        # Камера открывается в потоке захвата, чтобы не задерживать окно
+        self.source = source
+        self.cap = None
+
+        # Воспроизведение записанной сессии вместо камеры и кэш результатов
+        # анализа по хэшу кадра (см. recording.py)
+        replay = self.config['replay']
+        self.replay = None
+        self.cache = None
+        if replay['path']:
+            self.replay = SessionReplay(replay['path'], speed=replay['speed'], loop=replay['loop'])
+            if replay['cache']:
+                fingerprint = analysis_fingerprint(self.config)
+                self.cache = InferenceCache(replay['path'], fingerprint)
+                # Результаты, записанные с теми же настройками, не пересчитываются
+                if self.replay.meta.get('fingerprint') == fingerprint:
+                    self.cache.seed(self.replay.recorded_results())
+
+        recording = self.config['recording']
+        self.recorder = None
+        if recording['path']:
+            self.recorder = SessionRecorder(recording['path'], recording['chunk_frames'],
+                                            analysis_fingerprint(self.config))
         self._stop_event = threading.Event()
         self.current_emotion = None
-        self.game_active = False
         self.target_emotion = None
         self.face_region = None
-        self.frame_queue = queue.Queue(maxsize=1)
         self.emotion_labels = {}
 
+        # Конвейер: захват и отрисовка идут с частотой камеры,
+        # анализ в отдельном потоке всегда берет самый свежий кадр
+        # В режиме станции анализ выполняет общий для всех камер планировщик
+        if scheduler:
+            self.pipelined = True
+            self.inference = scheduler.register(str(source), self._build_result,
+                                                on_result=self._on_analysis,
+                                                max_fps=self.config['station']['max_fps'])
+        else:
+            # Запись воспроизводится последовательно: анализируется каждый кадр,
+            # и результаты анализа одинаковы от запуска к запуску. Время
+            # игровых режимов идет по часам машины, поэтому исход игры на
+            # записи без пауз может отличаться от исхода при записи
+            self.pipelined = self.config['pipelined'] and not self.replay
+            self.inference = InferenceStage(self._analyze, on_result=self._on_analysis)
+        self.frame_index = 0
+
+        # Неизменные кадры не анализируются заново, без игры и без лица
+        # анализ переходит на редкий режим простоя
+        gating = self.config['gating']
+        self.gate = FrameGate(size=gating['size'], pixel_threshold=gating['pixel_threshold'],
+                              changed_fraction=gating['changed_fraction'],
+                              refresh_interval=gating['refresh_interval'],
+                              idle_after=gating['idle_after'],
+                              idle_interval=gating['idle_interval']) \
+            if gating['enabled'] and not self.replay else None
+        self._last_reuse = 0.0
+        self._result_lock = threading.Lock()
+        self.cpu = CpuMeter()
+
+        # Подстройка входа детектора, частоты детекции и анализа под бюджет
+        # задержки; на станции модель общая, при воспроизведении нужна
+        # повторяемость, поэтому там контроллер не включается
+        adaptive = self.config['adaptive']
+        self.adaptive = AdaptiveController.from_config(adaptive) \
+            if adaptive['enabled'] and not scheduler and not self.replay else None
+        self.analysis_interval = 0.0
+        self._next_analysis = 0.0
+        # Возраст результата, нарисованного на последнем кадре: (кадров, мс)
+        self.result_age = (0, 0.0)
+
+        # Детектор и классификатор загружаются в фоне при запуске,
+        # на станции одна модель общая для всех камер. В режиме изоляции
+        # они работают в отдельном процессе (см. worker.py)
+        self.owns_engine = engine is None
+        if engine is None:
+            engine = RemoteEngine(self.config) if self.config['isolation']['enabled'] \
+                else EmotionEngine(self.config)
+        self.engine = engine
+
+        # Отслеживание лица между полными детекциями
+        tracking = self.config['tracking']
+        self.tracker = None
+        if tracking['enabled']:
+            self.tracker = FaceTracker(detect_interval=tracking['detect_interval'],
+                                       min_confidence=tracking['min_confidence'])
+
+        # Сглаженная эмоция, на которую реагируют игровые режимы
+        self.smoother = self._make_smoother()
+        self.stable_emotion = None
+        self.stable_label = None
+        # Игровые режимы ждут новые результаты вместо опроса
+        self.notifier = ResultNotifier()
+        # Игры идут по одной в потоке сессий (см. games.py); отмена будит
+        # ожидание результата, чтобы прежняя игра вышла сразу
+        self.games = GameScheduler(on_cancel=self.notifier.wake, on_started=self._on_game_started)
+
+        # Несколько лиц в кадре: одновременная дуэль двух игроков
+        self.multi_face = False
+        self.players = PlayerAssigner(max_players=2)
+        self.player_faces = ()
+        self.player_smoothers = {}
+        self.player_emotions = {}
+        # Ядро анализа без окна, общее с benchmarks/bench_pipeline.py
+        self.analyzer = FrameAnalyzer(self.engine, self._translate, self.tracker, self.players,
+                                      self.metrics)
+
         # Параметры режима дуэли
         self.player_scores = [0, 0]
         self.current_player = 0
@@ -73,195 +209,26 @@ class NeoFlexEmotionGame:
         self.duel_emotions = []
         self.duel_rounds = 3
 
-        # Параметры квеста
-        self.quest_stage = 0
-        self.quest_scenes = {
-            0: {
-                'text': "Вы стоите перед закрытой дверью секретной лаборатории NeoFlex.\n"
-                        "Охранник с подозрением смотрит на вас. Какой эмоцией вы попытаетесь его убедить?",
-                'emotions': {
-                    'злость': 1,
-                    'радость': 2,
-                    'удивление': 3,
-                    'нейтральность': 4
-                },
-                'image': 'lab_door.jpg'
-            },
-            1: {
-                'text': "Охранник нахмурился и достал электрошокер!\n"
-                        "Ваша агрессия только ухудшила ситуацию. Как теперь успокоить охранника?",
-                'emotions': {
-                    'грусть': 5,
-                    'страх': 6,
-                    'нейтральность': 7
-                },
-                'image': 'angry_guard.jpg'
-            },
-            2: {
-                'text': "Ваша искренняя улыбка растопила лед! Охранник пропускает вас.\n"
-                        "Внутри темно - выразите страх чтобы включить аварийное освещение.",
-                'emotions': {
-                    'страх': 8,
-                    'удивление': 9
-                },
-                'image': 'happy_guard.jpg'
-            },
-            3: {
-                'text': "Вы сделали удивленные глаза - охранник решил, что вы потерянный новичок\n"
-                        "и ведет вас к начальнику охраны. Как вы отреагируете?",
-                'emotions': {
-                    'радость': 10,
-                    'страх': 11,
-                    'нейтральность': 12
-                },
-                'image': 'security_chief.jpg'
-            },
-            4: {
-                'text': "Ваша нейтральность убедила охранника, что вы техник по обслуживанию.\n"
-                        "Он пропускает вас. В коридоре сработала сигнализация! Как реагируем?",
-                'emotions': {
-                    'страх': 13,
-                    'удивление': 14
-                },
-                'image': 'alarm.jpg'
-            },
-            5: {
-                'text': "Вы показали грусть - охранник смягчился и решил вас выслушать.\n"
-                        "Теперь убедите его, что вам действительно нужно внутрь!",
-                'emotions': {
-                    'радость': 15,
-                    'нейтральность': 16
-                },
-                'image': 'listening_guard.jpg'
-            },
-            6: {
-                'text': "Вы испугались - охранник решил, что вы заблудившийся сотрудник.\n"
-                        "Он ведет вас к выходу. Попробуйте изменить ситуацию!",
-                'emotions': {
-                    'радость': 17,
-                    'удивление': 18
-                },
-                'image': 'exit.jpg'
-            },
-            7: {
-                'text': "Вы сохранили спокойствие - охранник потерял к вам интерес.\n"
-                        "Теперь нужно незаметно проникнуть в серверную. Какое выражение лица сделаем?",
-                'emotions': {
-                    'нейтральность': 19,
-                    'страх': 20
-                },
-                'image': 'server_room.jpg'
-            },
-            8: {
-                'text': "Свет включился! Перед вами три двери с символами.\n"
-                        "Выберите эмоцию для выбора пути:",
-                'emotions': {
-                    'радость': 21,
-                    'грусть': 22,
-                    'удивление': 23
-                },
-                'image': 'three_doors.jpg'
-            },
-            9: {
-                'text': "Вы выглядели удивленными - охранник решил проверить вашу карту доступа.\n"
-                        "Нужно срочно придумать оправдание!",
-                'emotions': {
-                    'радость': 24,
-                    'грусть': 25
-                },
-                'image': 'access_card.jpg'
-            },
-            21: {
-                'text': "Вы выбрали дверь с солнцем - путь оптимизма!\n"
-                        "Внутри яркий свет и панель с кнопками. Какую эмоцию покажем?",
-                'emotions': {
-                    'радость': 26,
-                    'удивление': 27
-                },
-                'image': 'sunny_path.jpg'
-            },
-            22: {
-                'text': "Вы выбрали дверь с тучей - путь реализма.\n"
-                        "Внутри лаборатория с хмурыми учеными. Ваши действия?",
-                'emotions': {
-                    'нейтральность': 28,
-                    'грусть': 29
-                },
-                'image': 'lab.jpg'
-            },
-            23: {
-                'text': "Вы выбрали дверь с молнией - путь неожиданностей!\n"
-                        "Внутри мигающие экраны и робот-охранник. Как реагируем?",
-                'emotions': {
-                    'удивление': 30,
-                    'страх': 31
-                },
-                'image': 'robot_guard.jpg'
-            },
-            26: {
-                'text': "Ваша радость активировала дружелюбный ИИ!\n"
-                        "Он предлагает доступ к секретным данным. Как ответим?",
-                'emotions': {
-                    'радость': 32,
-                    'удивление': 33
-                },
-                'image': 'friendly_ai.jpg'
-            },
-            32: {
-                'text': "ПОЗДРАВЛЯЕМ! Вы успешно завершили квест!\n"
-                        "ИИ передал вам секретные данные NeoFlex и даже предложил работу!",
-                'emotions': {},
-                'image': 'success.jpg',
-                'final': True
-            },
-            28: {
-                'text': "Ваша нейтральность убедила ученых, что вы проверяющий.\n"
-                        "Они показывают вам секретный проект. Ваша реакция?",
-                'emotions': {
-                    'удивление': 34,
-                    'нейтральность': 35
-                },
-                'image': 'secret_project.jpg'
-            },
-            35: {
-                'text': "ПОЗДРАВЛЯЕМ! Вы сохранили хладнокровие и получили\n"
-                        "доступ ко всем данным проекта! Миссия выполнена!",
-                'emotions': {},
-                'image': 'success2.jpg',
-                'final': True
-            },
-            30: {
-                'text': "Робот сканирует ваше лицо! Ваше удивление его сбило с толку.\n"
-                        "Он просит подтвердить личность. Как ответим?",
-                'emotions': {
-                    'радость': 36,
-                    'страх': 37
-                },
-                'image': 'robot_scan.jpg'
-            },
-            36: {
-                'text': "ПОЗДРАВЛЯЕМ! Ваша позитивная реакция взломала\n"
-                        "систему защиты! Робот теперь под вашим контролем!",
-                'emotions': {},
-                'image': 'robot_friend.jpg',
-                'final': True
-            },
-            37: {
-                'text': "К сожалению, ваш страх активировал систему защиты.\n"
-                        "Миссия провалена! Попробуйте еще раз!",
-                'emotions': {},
-                'image': 'failure.jpg',
-                'final': True
-            },
-            33: {
-                'text': "ИИ счел ваше удивление подозрительным и заблокировал доступ.\n"
-                        "Миссия провалена! Попробуйте другой подход!",
-                'emotions': {},
-                'image': 'ai_blocked.jpg',
-                'final': True
-            }
-        }
+        # Параметры квеста: сцены из файлов папки quests (см. quest_graph.py)
+        quest = self.config['quest']
+        self.quests = QuestLibrary(quest['directory'] or QUESTS_DIR,
+                                   label_ids(EMOTION_LABELS, self.emotion_translations),
+                                   len(EMOTION_LABELS), quest['prefetch_depth'])
+        name = quest['name'] if quest['name'] in self.quests else next(iter(self.quests.ids), None)
+        self.quest = self.quests.get(name) if name else None
+        if self.quest:
+            for problem in self.quest.problems():
+                print(f"Квест {self.quest.id}: {problem}")
+        self.quest_scene = self.quest.start if self.quest else 0
+        # Окно квеста создается один раз, картинки сцен готовятся заранее
+        # в фоне: первые - пока загружаются модели, дальше - достижимые
+        # из текущей сцены
+        self.quest_images = SceneImageCache(quest['image_size'], quest['cache_size'])
+        if self.quest:
+            self.quest_images.prefetch(self.quest.assets[self.quest.start])
+        self.quest_switch_times = []
         self.quest_window = None
+        self.quest_photo = None
         self.quest_image_label = None
         self.quest_text_label = None
         self.quest_timer_label = None
@@ -270,10 +237,39 @@ class NeoFlexEmotionGame:
         self.setup_styles()
         self.setup_gui()
 
-        # Запуск потоков
+        # Вывод видео: одно PhotoImage, обновление по приходу кадра
+        self.display = FrameDisplay(self.video_label,
+                                    on_frame=lambda: self._record_startup('first_frame'),
+                                    metrics=self.metrics)
+
+        # Экспорт метрик: CSV с ротацией и страница /metrics для сборщика
+        self.metrics_exporters = []
+        if self.metrics.enabled:
+            self.root.bind(metrics['hud_key'], self.toggle_hud)
+            if metrics['csv']:
+                self.metrics_exporters.append(CsvExporter(self.metrics, metrics['csv'],
+                                                          interval=metrics['csv_interval'],
+                                                          max_bytes=metrics['csv_max_bytes']))
+            if metrics['port']:
+                self.metrics_exporters.append(MetricsServer(self.metrics, metrics['host'],
+                                                            metrics['port']))
+            for exporter in self.metrics_exporters:
+                exporter.start()
+
+        # Трансляция размеченного видео на большой экран и в браузеры зрителей
+        self.stream = None
+        stream = self.config['stream']
+        if stream['enabled']:
+            self.stream = StreamServer(host=stream['host'], port=stream['port'],
+                                       quality=stream['quality'], max_fps=stream['max_fps'],
+                                       max_width=stream['max_width'])
+            self.stream.start()
+
+        # Запуск потоков: видео показывается сразу, модели грузятся в фоне
+        self.startup_thread = threading.Thread(target=self._startup, daemon=True)
+        self.startup_thread.start()
         self.camera_thread = threading.Thread(target=self._camera_loop)
         self.camera_thread.start()
-        self.root.after(10, self.update_frame)
 
     def setup_styles(self):
         style = ttk.Style()
@@ -381,15 +377,18 @@ class NeoFlexEmotionGame:
         button_frame = ttk.Frame(control_frame)
         button_frame.pack(pady=20)
 
-        ttk.Button(button_frame,
-                   text="Начать анализ",
-                   style='Neo.TButton',
-                   command=self.start_game).pack(side=tk.LEFT, padx=5)
+        # Кнопка недоступна, пока модели не загружены
+        self.start_button = ttk.Button(button_frame,
+                                       text="Начать анализ",
+                                       style='Neo.TButton',
+                                       command=self.start_game)
+        self.start_button.pack(side=tk.LEFT, padx=5)
+        self.start_button.state(['disabled'])
 
         ttk.Button(button_frame,
                    text="Выход",
                    style='Neo.TButton',
-                   command=self.stop).pack(side=tk.RIGHT, padx=5)
+                   command=self.exit).pack(side=tk.RIGHT, padx=5)
 
         # Статусная панель
         self.status_var = tk.StringVar()
@@ -403,122 +402,333 @@ class NeoFlexEmotionGame:
                   anchor=tk.CENTER,
                   font=self.FONTS['body']).pack(fill=tk.BOTH, expand=True)
 
-    def _camera_loop(self):
-        while not self._stop_event.is_set():
-            ret, frame = self.cap.read()
-            if not ret: continue
-
-            processed_frame = self.process_frame(frame)
-
-            try:
-                self.frame_queue.put_nowait(processed_frame)
-            except queue.Full:
-                try:
-                    self.frame_queue.get_nowait()
-                except queue.Empty:
-                    pass
-                self.frame_queue.put_nowait(processed_frame)
-
-    def process_frame(self, frame):
-        # Конвертируем BGR в RGB сразу после получения кадра
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        original_height, original_width = frame_rgb.shape[:2]
-        small_frame = cv2.resize(frame_rgb, (0, 0), fx=0.5, fy=0.5)
+    def _startup(self):
+        # Загрузка идет в фоновом потоке, строка статуса меняется через _set_status
+        def progress(text, fraction):
+            self._set_status(f"{text} {int(fraction * 100)}%")
 
         try:
-            # Для анализа DeepFace конвертируем обратно в BGR
-            result = DeepFace.analyze(
-                cv2.cvtColor(small_frame, cv2.COLOR_RGB2BGR),
-                actions=['emotion'],
-                enforce_detection=False,
-                detector_backend='ssd',
-                silent=True
-            )
-
-            analysis = result[0] if isinstance(result, list) else result
-            english_emotion = analysis['dominant_emotion']
-            self.current_emotion = self.emotion_translations.get(english_emotion, 'неизвестно')
-            region = analysis['region']
-
-            scale_x = original_width / small_frame.shape[1]
-            scale_y = original_height / small_frame.shape[0]
-
-            self.face_region = (
-                int(region['x'] * scale_x),
-                int(region['y'] * scale_y),
-                int(region['w'] * scale_x),
-                int(region['h'] * scale_y)
-            )
-
+            # Тяжелый стек (DeepFace, TensorFlow) импортируется только здесь
+            if self.owns_engine:
+                self.engine.load(progress)
+            else:
+                progress("Ожидание общей модели...", 0.0)
+                while not self.engine.ready.wait(0.5):
+                    if self.engine.error:
+                        raise self.engine.error
         except Exception as e:
-            self.current_emotion = None
-            self.face_region = None
-
-        # Работаем с RGB изображением для рисования
-        pil_img = Image.fromarray(frame_rgb)
-        draw = ImageDraw.Draw(pil_img)
-
-        # Пытаемся загрузить шрифт, если не получается - используем стандартный
-        try:
-            font = ImageFont.truetype("arial.ttf", 24)
-        except:
-            try:
-                font = ImageFont.truetype("DejaVuSans.ttf", 24)
-            except:
-                font = ImageFont.load_default()
-
-        if self.face_region:
-            x, y, w, h = self.face_region
-            draw.rectangle([(x, y), (x + w, y + h)],
-                           outline=self.hex_to_rgb(self.COLORS['accent']),
-                           width=2)
-
-        if self.game_active and self.target_emotion:
-            draw.text((20, frame.shape[0] - 40),
-                      f"Цель: {self.target_emotion.upper()}",
-                      font=font,
-                      fill=self.hex_to_rgb(self.COLORS['primary']))
-
-        text = self.current_emotion or "Лицо не обнаружено"
-        draw.text((20, 60),
-                  f"Текущая: {text.upper()}",
-                  font=font,
-                  fill=self.hex_to_rgb(self.COLORS['secondary']))
+            print(f"Ошибка загрузки моделей: {str(e)}")
+            self._set_status("Не удалось загрузить модели распознавания")
+            return
+        finally:
+            if importtime.is_enabled():
+                importtime.report()
 
-        if self.game_active and self.mode_var.get() == "duel":
-            draw.text((frame.shape[1] - 200, 60),
-                      f"Игрок {self.current_player + 1}",
-                      font=font,
-                      fill=self.hex_to_rgb(self.COLORS['accent']))
+        if self.adaptive:
+            self._apply_level(self.adaptive.level)
+        if self.pipelined:
+            self.inference.start()
+        self.root.after(0, self._on_models_ready)
 
-            draw.text((frame.shape[1] - 250, 100),
-                      f"Счет: {self.player_scores[0]} - {self.player_scores[1]}",
-                      font=font,
-                      fill=self.hex_to_rgb(self.COLORS['secondary']))
+    def _on_models_ready(self):
+        self.start_button.state(['!disabled'])
+        self.status_var.set("Модели готовы! Выберите режим и нажмите 'Начать анализ'")
 
-            draw.text((frame.shape[1] - 200, 140),
-                      f"Раунд {self.round_number}/3",
-                      font=font,
-                      fill=self.hex_to_rgb(self.COLORS['primary']))
+    def _record_startup(self, name):
+        if name in self.startup_metrics:
+            return
+        self.startup_metrics[name] = (time.monotonic() - self.startup_started) * 1000.0
 
-        # Конвертируем обратно в BGR перед возвращением кадра
-        return cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
+        if len(self.startup_metrics) == 2:
+            metrics = dict(self.startup_metrics)
+            metrics.update({f'load_{k}': v * 1000.0 for k, v in self.engine.load_times.items()})
+            print("Запуск: " + ", ".join(f"{k} {v:.0f} мс" for k, v in metrics.items()))
 
-    def hex_to_rgb(self, hex_color):
-        hex_color = hex_color.lstrip('#')
-        return tuple(int(hex_color[i:i + 2], 16) for i in (0, 2, 4))
+            log_path = self.config['startup']['log']
+            if log_path:
+                metrics['time'] = time.time()
+                with open(log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(metrics) + '\n')
 
-    def update_frame(self):
+    def _camera_loop(self):
+        self.cap = self.replay or CameraCapture.from_config(self.source, self.config['camera'])
+        metrics = self.metrics
+        while not self._stop_event.is_set():
+            started = metrics.start()
+            ret, frame = self.cap.read()
+            if not ret:
+                if self.replay:
+                    # Запись закончилась
+                    break
+                # Пауза и переподключение - внутри CameraCapture
+                continue
+            metrics.observe('capture', started)
+
+            self.frame_index += 1
+            # У записи свое время захвата, перенесенное на монотонные часы
+            timestamp = getattr(self.cap, 'timestamp', None) or time.monotonic()
+            if self.recorder:
+                self.recorder.write(self.frame_index, timestamp, frame)
+
+            analyze = timestamp >= self._next_analysis
+            unchanged = False
+            if analyze and self.gate:
+                face_present = self.face_region is not None or bool(self.player_faces)
+                analyze = self.gate.update(frame, timestamp, face_present, self.game_active)
+                unchanged = not analyze
+            if analyze:
+                self._next_analysis = timestamp + self.analysis_interval
+
+            if self.pipelined or not analyze:
+                if analyze:
+                    self.inference.submit(self.frame_index, timestamp, frame)
+                elif unchanged and not self.inference.busy:
+                    # Повтор только для кадра, который FrameGate счел неизменным, и
+                    # только когда измененный кадр не анализируется: иначе прошлый
+                    # результат получил бы время новее еще не готового
+                    self._reuse_result(timestamp)
+                result = self.inference.latest
+                if result:
+                    self.result_age = result.age(self.frame_index, timestamp)
+                    metrics.record('inference_age', self.result_age[1])
+                started = metrics.start()
+                processed_frame = self.render_overlay(frame)
+                metrics.observe('overlay', started)
+            else:
+                processed_frame = self.process_frame(frame, timestamp,
+                                                     getattr(self.cap, 'digest', None))
+
+            started = metrics.start()
+            self.display.submit(processed_frame, timestamp)
+            metrics.observe('display_convert', started)
+            if metrics.enabled:
+                metrics.gauge('analysis_dropped', self.inference.dropped)
+                if self.gate:
+                    metrics.gauge('gate_skipped_percent', 100.0 * self.gate.skipped_fraction)
+                    metrics.gauge('gate_idle', int(self.gate.state == FrameGate.IDLE))
+                metrics.gauge('cpu_percent', self.cpu.percent())
+                if not self.replay:
+                    metrics.gauge('camera_reconnects', self.cap.reconnects)
+                    metrics.gauge('camera_drained', self.cap.drained)
+            if self.stream:
+                self.stream.publish(processed_frame)
+
+            if self.adaptive:
+                self._adapt(frame)
+
+        if self.gate:
+            print(f"Анализ пропущен для {100.0 * self.gate.skipped_fraction:.0f}% кадров, "
+                  f"пробуждений из простоя: {self.gate.wakeups}, "
+                  f"средняя загрузка CPU: {self.cpu.percent():.0f}%")
+
+        # Файлы записи и кэша закрывает поток, который в них пишет
+        if self.recorder:
+            self.recorder.close()
+            print(f"Записано кадров: {self.recorder.frames}")
+        if self.cache:
+            self.cache.close()
+            print(f"Кэш анализа: {self.cache.hits} попаданий, {self.cache.misses} промахов")
+
+    def _adapt(self, frame):
+        # Ширина самого мелкого лица ограничивает снижение входа детектора
+        widths = [face.region[2] for face in self.player_faces]
+        if self.face_region:
+            widths.append(self.face_region[2])
+        self.adaptive.observe_frame(min(widths) if widths else None, frame.shape[1])
+
+        adaptive = self.adaptive
+        if adaptive.update(time.monotonic(), self.display.fps):
+            self._apply_level(adaptive.level)
+            print(f"Адаптация: {adaptive.level} ({adaptive.reason})")
+
+        metrics = self.metrics
+        if metrics.enabled:
+            metrics.gauge('adaptive_level', adaptive.level.index)
+            metrics.gauge('adaptive_input_size', adaptive.level.input_size[0])
+            metrics.gauge('adaptive_detect_interval', adaptive.level.detect_interval)
+            metrics.gauge('adaptive_max_fps', adaptive.level.max_fps)
+            metrics.gauge('adaptive_age_p90_ms', adaptive.age_ms)
+            metrics.gauge('adaptive_cpu_headroom_percent', 100.0 * adaptive.headroom)
+
+    def _apply_level(self, level):
         try:
-            frame = self.frame_queue.get_nowait()
-            img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            imgtk = ImageTk.PhotoImage(image=img)
-            self.video_label.imgtk = imgtk
-            self.video_label.configure(image=imgtk)
-        except queue.Empty:
-            pass
-        finally:
-            self.root.after(15, self.update_frame)
+            self.engine.set_detector_input(level.input_size)
+        except WorkerError as e:
+            print(f"Ошибка смены входа детектора: {str(e)}")
+        if self.tracker:
+            self.tracker.detect_interval = level.detect_interval
+        self.analysis_interval = 1.0 / level.max_fps if level.max_fps else 0.0
+
+    def _reuse_result(self, timestamp):
+        # Кадр не изменился: прошлый результат публикуется заново с временем
+        # нового кадра, не чаще reuse_interval, чтобы сглаживание и игровые
+        # режимы продолжали получать результаты
+        last = self.notifier.latest
+        if last is None:
+            return
+        if timestamp - max(self._last_reuse, last.timestamp) < self.config['gating']['reuse_interval']:
+            return
+        self._last_reuse = timestamp
+        self._on_analysis(AnalysisResult(last.emotion, last.region, last.probabilities, last.faces,
+                                         self.frame_index, timestamp))
+
+    def _on_analysis(self, result):
+        # Результаты приходят из потока анализа, а повторы - из потока камеры;
+        # сглаживание и состояние игры обновляет один поток за раз
+        with self._result_lock:
+            self._apply_result(result)
+
+    def _apply_result(self, result):
+        # У повторно опубликованного результата задержки анализа нет; в
+        # запись попадают только настоящие результаты, по ним заполняется кэш
+        if result.latency:
+            self.metrics.record('analysis', result.latency * 1000.0)
+            if self.adaptive:
+                self.adaptive.observe_result((time.monotonic() - result.timestamp) * 1000.0)
+            if self.recorder:
+                self.recorder.write_result(result, self.multi_face)
+        # Первый завершенный анализ после загрузки моделей, даже без лица в кадре
+        if result.latency and self.engine.ready.is_set():
+            self._record_startup('first_inference')
+        self.current_emotion = result.emotion
+        self.face_region = result.region
+        self.player_faces = result.faces
+
+        # Игровые режимы получают эмоцию после сглаживания и гистерезиса
+        self.stable_label = self.smoother.push(result.timestamp, result.probabilities)
+        self.stable_emotion = self._label_name(self.stable_label)
+
+        faces = {face.player: face for face in result.faces}
+        for player in set(faces) | set(self.player_smoothers):
+            smoother = self.player_smoothers.get(player)
+            if smoother is None:
+                smoother = self.player_smoothers[player] = self._make_smoother()
+            face = faces.get(player)
+            label = smoother.push(result.timestamp, face.probabilities if face else None)
+            self.player_emotions[player] = self._label_name(label)
+
+        result.stable_emotion = self.stable_emotion
+        result.stable_label = self.stable_label
+        result.player_emotions = dict(self.player_emotions)
+        self.notifier.publish(result)
+
+    def _make_smoother(self):
+        smoothing = self.config['smoothing']
+        return EmotionSmoother(method=smoothing['method'],
+                               half_life=smoothing['half_life'],
+                               window=smoothing['window'],
+                               enter_threshold=smoothing['enter_threshold'],
+                               exit_threshold=smoothing['exit_threshold'],
+                               num_classes=len(EMOTION_LABELS))
+
+    def _label_name(self, label):
+        if label is None:
+            return None
+        return self.emotion_translations.get(EMOTION_LABELS[label], 'неизвестно')
+
+    def _translate(self, probabilities):
+        return self._label_name(int(probabilities.argmax()))
+
+    def analyze_frame(self, frame):
+        """Анализ кадра BGR: эмоция и область лица в координатах кадра"""
+        return self.analyzer.analyze(frame, self.multi_face)
+
+    def _build_result(self, frame, boxes, probabilities):
+        # Для общего планировщика станции: рамки и вероятности уже посчитаны
+        return self.analyzer.build_result(frame, boxes, probabilities, self.multi_face)
+
+    def _analyze(self, frame, digest=None):
+        # При воспроизведении записи результат сначала ищется в кэше;
+        # хэш кадра берется из индекса записи, если он передан
+        if not self.cache:
+            return self.analyze_frame(frame)
+
+        key = cache_key(digest or frame_digest(frame), self.multi_face)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.analyze_frame(frame)
+            if self.engine.ready.is_set():
+                self.cache.put(key, result)
+        return result
+
+    def process_frame(self, frame, timestamp=None, digest=None):
+        # Последовательный режим: анализ и отрисовка на одном кадре
+        started = time.monotonic()
+        try:
+            result = self._analyze(frame, digest)
+        except Exception as e:
+            print(f"Ошибка анализа: {str(e)}")
+            result = AnalysisResult()
+        result.frame_index = self.frame_index
+        result.timestamp = timestamp or started
+        result.latency = time.monotonic() - started
+        self._on_analysis(result)
+        self.result_age = (0, result.latency * 1000.0)
+        started = self.metrics.start()
+        processed_frame = self.render_overlay(frame)
+        self.metrics.observe('overlay', started)
+        return processed_frame
+
+    def render_overlay(self, frame):
+        if self.engine.ready.is_set():
+            current = self.current_emotion or "Лицо не обнаружено"
+        else:
+            current = "загрузка моделей..."
+        duel = None
+        if self.game_active and self.mode_var.get() == "duel":
+            duel = ("Оба игрока" if self.multi_face else f"Игрок {self.current_player + 1}",
+                    self.player_scores, self.round_number)
+        return render_game_overlay(
+            self.overlay, frame,
+            faces=self.player_faces if self.multi_face else (),
+            region=None if self.multi_face else self.face_region,
+            target=self.target_emotion if self.game_active else None,
+            current=current, latency=self._latency_line(), duel=duel,
+            hud=self._hud_lines() if self.hud_visible else ())
+
+    def _latency_line(self):
+        # Цифры меняются почти каждый кадр, поэтому строка, как и HUD,
+        # пересчитывается дважды в секунду и рисуется из кэша надписей
+        now = time.monotonic()
+        if now - self._latency_updated >= 0.5:
+            age_frames, age_ms = self.result_age
+            text = (f"Задержка анализа: {age_frames} кадр. / {age_ms:.0f} мс | "
+                    f"экран: {self.display.fps:.0f} fps, пропущено {self.display.dropped}, "
+                    f"от камеры {self.display.latency_ms:.0f} мс")
+            if self.adaptive:
+                level = self.adaptive.level
+                text += f" | качество {level.index}: {level.input_size[0]}px"
+            self.latency_text = text
+            self._latency_updated = now
+        return self.latency_text
+
+    def toggle_hud(self, event=None):
+        self.hud_visible = not self.hud_visible
+        self._hud_snapshot = None
+
+    def _hud_lines(self):
+        # Строки HUD пересчитываются дважды в секунду: так надписи
+        # читаются и не растеризуются заново на каждом кадре
+        now = time.monotonic()
+        if now - self._hud_updated >= 0.5:
+            snapshot = self.metrics.snapshot()
+            if self._hud_snapshot is not None:
+                self.hud_lines = hud_lines(interval_stats(snapshot, self._hud_snapshot))
+            self._hud_snapshot = snapshot
+            self._hud_updated = now
+        return self.hud_lines
+
+    @property
+    def game_active(self):
+        return self.games.active
+
+    def _set_status(self, text):
+        # Строка статуса меняется только в главном потоке
+        self.root.after(0, self.status_var.set, text)
+
+    def _on_game_started(self, session, latency_ms):
+        self.metrics.record('game_start', latency_ms)
+        print(f"Игра {session.name}: запуск через {latency_ms:.0f} мс")
 
     def start_game(self):
         mode = self.mode_var.get()
@@ -526,27 +736,43 @@ class NeoFlexEmotionGame:
             self.status_var.set("Сначала выберите режим!")
             return
 
-        # Остановка предыдущей игры
-        self.game_active = False
-        time.sleep(0.1)  # Даем время для остановки предыдущего потока
+        # Прежняя игра отменяется, новая начнется, как только та выйдет
+        if mode == "hold":
+            self.games.cancel()
+            self.show_emotion_selection()
+        else:
+            self.games.start(mode, self._run_game, mode)
 
-        self.game_active = True
-        self.target_emotion = None
+    def _run_game(self, mode, emotion=None):
+        # Состояние сбрасывается в потоке сессий: прежняя игра уже вышла
+        self.target_emotion = emotion
         self.player_scores = [0, 0]
         self.current_player = 0
         self.round_number = 1
-        self.quest_stage = 0
 
-        if mode == "max":
-            threading.Thread(target=self.mode_max_emotions).start()
-        elif mode == "random":
-            threading.Thread(target=self.mode_random_emotions).start()
-        elif mode == "hold":
-            self.show_emotion_selection()
-        elif mode == "duel":
-            threading.Thread(target=self.mode_duel).start()
-        elif mode == "quest":
-            self.start_emotion_quest()
+        # В дуэли оба игрока анализируются в одном кадре одновременно
+        self._reset_players(mode == "duel" and self.config['duel']['simultaneous'])
+        try:
+            if mode == "max":
+                self.mode_max_emotions()
+            elif mode == "random":
+                self.mode_random_emotions()
+            elif mode == "hold":
+                self.mode_hold_emotion()
+            elif mode == "duel":
+                self.mode_duel()
+            elif mode == "quest":
+                self.start_emotion_quest()
+        finally:
+            # После дуэли, в том числе отмененной, анализ снова ищет одно лицо
+            self._reset_players(False)
+
+    def _reset_players(self, multi_face):
+        self.multi_face = multi_face
+        self.players.reset()
+        self.player_faces = ()
+        self.player_smoothers = {}
+        self.player_emotions = {}
 
     def show_emotion_selection(self):
         selection_win = tk.Toplevel(self.root)
@@ -566,138 +792,184 @@ class NeoFlexEmotionGame:
 
     def start_hold_mode(self, emotion, win):
         win.destroy()
-        self.target_emotion = emotion
-        threading.Thread(target=self.mode_hold_emotion).start()
+        self.games.start("hold", self._run_game, "hold", emotion)
 
     def update_emotion_indicator(self, emotion, active=True):
         """Обновление индикатора эмоции"""
         color = self.COLORS['accent'] if active else 'white'
         self.emotion_labels[emotion].configure(background=color)
 
+    def _wait_result(self, sequence, deadline=None):
+        """Ждать следующий результат анализа: (номер, результат или None)
+
+        Ожидание прерывается не реже RESULT_WAIT секунд, чтобы обновить
+        таймер и проверить, не остановлена ли игра.
+        """
+        timeout = self.RESULT_WAIT
+        if deadline is not None:
+            timeout = max(0.0, min(timeout, deadline - time.monotonic()))
+        result = self.notifier.wait(sequence, timeout)
+        # Отмененная игра выходит сразу после пробуждения
+        self.games.check()
+        return result
+
     def mode_max_emotions(self):
         self.target_emotion = "Показывайте разные эмоции!"
-        start_time = time.time()
+        start_time = time.monotonic()
+        deadline = start_time + 30
         emotions = set()
 
         for emotion in self.emotions_list:
             self.root.after(0, self.update_emotion_indicator, emotion, False)
 
-        while (time.time() - start_time) < 30 and self.game_active:
-            if self.current_emotion in self.emotions_list:
-                if self.current_emotion not in emotions:
-                    emotions.add(self.current_emotion)
-                    self.root.after(0, self.update_emotion_indicator,
-                                    self.current_emotion, True)
+        sequence = self.notifier.sequence
+        while time.monotonic() < deadline and self.game_active:
+            sequence, result = self._wait_result(sequence, deadline)
+            emotion = result.stable_emotion if result else None
+            if emotion in self.emotions_list and emotion not in emotions:
+                emotions.add(emotion)
+                self.root.after(0, self.update_emotion_indicator, emotion, True)
 
-            remaining = int(30 - (time.time() - start_time))
-            self.status_var.set(f"Осталось: {remaining} сек | Уникальных эмоций: {len(emotions)}")
-            time.sleep(0.1)
+            remaining = max(0, int(deadline - time.monotonic()))
+            self._set_status(f"Осталось: {remaining} сек | Уникальных эмоций: {len(emotions)}")
 
-        self.game_active = False
-        self.status_var.set(f"Игра окончена! Показано {len(emotions)} различных эмоций!")
+        # Отмененная игра выходит из цикла по game_active и итог не пишет
+        self.games.check()
+        self._set_status(f"Игра окончена! Показано {len(emotions)} различных эмоций!")
 
     def mode_random_emotions(self):
         self.target_emotion = random.choice(self.emotions_list)
         correct = 0
+        reactions = []
 
         for _ in range(3):
-            self.status_var.set(f"Покажите: {self.target_emotion.upper()}!")
-            start_time = time.time()
-
-            while (time.time() - start_time) < 10 and self.game_active:
-                if self.current_emotion == self.target_emotion:
+            self.games.check()
+            self._set_status(f"Покажите: {self.target_emotion.upper()}!")
+            start_time = time.monotonic()
+            deadline = start_time + 10
+
+            sequence = self.notifier.sequence
+            while time.monotonic() < deadline and self.game_active:
+                sequence, result = self._wait_result(sequence, deadline)
+                if result and result.stable_emotion == self.target_emotion:
+                    # Время реакции по моменту захвата кадра, а не пробуждения потока
+                    reactions.append(result.timestamp - start_time)
                     correct += 1
                     self.target_emotion = random.choice(self.emotions_list)
                     break
-                time.sleep(0.1)
 
-        self.game_active = False
-        self.status_var.set(f"Правильных ответов: {correct} из 3")
+        self.games.check()
+        reaction = f" | Среднее время реакции: {sum(reactions) / len(reactions):.2f} сек" if reactions else ""
+        self._set_status(f"Правильных ответов: {correct} из 3{reaction}")
 
     def mode_hold_emotion(self):
         for i in range(3, 0, -1):
             if not self.game_active:
                 return
-            self.status_var.set(f"Приготовьтесь... {i}")
-            time.sleep(1)
+            self._set_status(f"Приготовьтесь... {i}")
+            self.games.sleep(1)
 
-        start_time = time.time()
+        start_time = time.monotonic()
         max_duration = 0
-        self.status_var.set("Начали! Держите эмоцию!")
+        self._set_status("Начали! Держите эмоцию!")
 
+        sequence = self.notifier.sequence
         while self.game_active:
-            if self.current_emotion != self.target_emotion:
+            sequence, result = self._wait_result(sequence)
+            if result is None:
+                continue
+
+            # Длительность считается по времени захвата кадров
+            duration = max(0.0, result.timestamp - start_time)
+            if result.stable_emotion != self.target_emotion:
                 break
 
-            current_time = time.time()
-            duration = current_time - start_time
             max_duration = max(max_duration, duration)
+            self._set_status(f"Удержано: {duration:.1f} сек | Рекорд: {max_duration:.1f} сек")
 
-            self.status_var.set(f"Удержано: {duration:.1f} сек | Рекорд: {max_duration:.1f} сек")
-            time.sleep(0.1)
-
-        self.game_active = False
-        self.status_var.set(f"Финальный результат: {max_duration:.1f} секунд!")
+        self.games.check()
+        self._set_status(f"Финальный результат: {max_duration:.1f} секунд!")
 
     def mode_duel(self):
         self.duel_emotions = random.sample(self.emotions_list, 3)
-        self.status_var.set("Дуэль начинается! Приготовьтесь!")
-        time.sleep(2)
+        self._set_status("Дуэль начинается! Приготовьтесь!")
+        self.games.sleep(2)
 
         for i, emotion in enumerate(self.duel_emotions, 1):
             if not self.game_active:
                 break
 
             self.round_number = i
+            if self.multi_face:
+                self._duel_round_simultaneous(i, emotion)
+                continue
+
             for player in [0, 1]:
                 if not self.game_active:
                     break
 
                 self.current_player = player
-                self.status_var.set(f"Раунд {i} | Игрок {player + 1} | Покажите: {emotion.upper()}!")
-                start_time = time.time()
+                self._set_status(f"Раунд {i} | Игрок {player + 1} | Покажите: {emotion.upper()}!")
+                deadline = time.monotonic() + 10
                 success = False
 
-                while (time.time() - start_time) < 10 and self.game_active:
-                    if self.current_emotion == emotion:
+                sequence = self.notifier.sequence
+                while time.monotonic() < deadline and self.game_active:
+                    sequence, result = self._wait_result(sequence, deadline)
+                    if result and result.stable_emotion == emotion:
                         self.player_scores[player] += 1
                         success = True
                         break
-                    time.sleep(0.1)
 
+                self.games.check()
                 feedback = "Успешно!" if success else "Время вышло!"
-                self.status_var.set(f"Игрок {player + 1}: {feedback}")
-                time.sleep(2 if success else 1)
+                self._set_status(f"Игрок {player + 1}: {feedback}")
+                self.games.sleep(2 if success else 1)
 
+        self.games.check()
         winner = "Ничья!"
         if self.player_scores[0] > self.player_scores[1]:
             winner = "Победил Игрок 1!"
         elif self.player_scores[1] > self.player_scores[0]:
             winner = "Победил Игрок 2!"
 
-        self.status_var.set(f"Дуэль завершена! {winner} Счет: {self.player_scores[0]} - {self.player_scores[1]}")
-        self.game_active = False
-
-    def show_quest_scene(self):
-        # Закрываем предыдущее окно квеста
-        if self.quest_window:
-            self.quest_window.destroy()
-
-        # Создаем новое окно квеста
+        self._set_status(f"Дуэль завершена! {winner} Счет: {self.player_scores[0]} - {self.player_scores[1]}")
+
+    def _duel_round_simultaneous(self, round_number, emotion):
+        # Оба игрока играют раунд одновременно, каждый засчитывается отдельно
+        self._set_status(f"Раунд {round_number} | Оба игрока | Покажите: {emotion.upper()}!")
+        start_time = time.monotonic()
+        deadline = start_time + 10
+        reactions = {}
+
+        sequence = self.notifier.sequence
+        while time.monotonic() < deadline and self.game_active and len(reactions) < 2:
+            sequence, result = self._wait_result(sequence, deadline)
+            if result is None:
+                continue
+            for player, player_emotion in result.player_emotions.items():
+                if player not in reactions and player_emotion == emotion:
+                    self.player_scores[player] += 1
+                    reactions[player] = result.timestamp - start_time
+
+        self.games.check()
+        feedback = " | ".join(
+            f"Игрок {player + 1}: " + (f"Успешно за {reactions[player]:.1f} сек!"
+                                       if player in reactions else "Время вышло!")
+            for player in [0, 1])
+        self._set_status(feedback)
+        self.games.sleep(2)
+
+    def _build_quest_window(self):
         self.quest_window = tk.Toplevel(self.root)
         self.quest_window.title("Эмоциональный квест")
         self.quest_window.geometry("600x500")
         self.quest_window.transient(self.root)
-        self.quest_window.grab_set()
-
-        scene = self.quest_scenes.get(self.quest_stage, None)
-        if not scene:
-            return
+        self.quest_window.protocol("WM_DELETE_WINDOW", self._hide_quest_window)
 
         # Текст сцены
         self.quest_text_label = ttk.Label(
             self.quest_window,
-            text=scene['text'],
             font=self.FONTS['h2'],
             wraplength=550,
             background=self.COLORS['primary'],
@@ -706,43 +978,101 @@ class NeoFlexEmotionGame:
         )
         self.quest_text_label.pack(pady=20, fill=tk.X)
 
-        # Изображение сцены
-        try:
-            img = Image.open(scene['image'])
-            img = img.resize((400, 300), Image.Resampling.LANCZOS)
-            photo = ImageTk.PhotoImage(img)
-            self.quest_image_label = ttk.Label(self.quest_window, image=photo)
-            self.quest_image_label.image = photo
-            self.quest_image_label.pack()
-        except Exception as e:
-            print(f"Ошибка загрузки изображения: {str(e)}")
+        # Изображение сцены: одно PhotoImage, в которое копируются картинки
+        self.quest_photo = ImageTk.PhotoImage(Image.new('RGB', self.quest_images.size))
+        self.quest_image_label = ttk.Label(self.quest_window, image=self.quest_photo)
+        self.quest_image_label.pack()
 
-        # Добавляем сообщение о необходимости показать эмоцию
+        # Сообщение о необходимости показать эмоцию
         self.quest_timer_label = ttk.Label(
             self.quest_window,
-            text="Подготовьтесь... Анализ эмоций начнется через 3 секунды",
             font=self.FONTS['h2'],
             foreground=self.COLORS['accent'],
             padding=10
         )
         self.quest_timer_label.pack(pady=10)
 
+    def _hide_quest_window(self):
+        if self.quest_window:
+            self.quest_window.grab_release()
+            self.quest_window.withdraw()
+
+    def show_quest_scene(self):
+        quest, scene = self.quest, self.quest_scene
+        started = time.monotonic()
+        if self.quest_window is None:
+            self._build_quest_window()
+
+        self.quest_text_label.config(text=quest.texts[scene])
+        image = self.quest_images.get(quest.images[scene]) if quest.images[scene] else None
+        if image is None:
+            self.quest_image_label.config(image='')
+        else:
+            self.quest_photo.paste(image)
+            self.quest_image_label.config(image=self.quest_photo)
+        if scene in quest.dead_ends:
+            text = UNFINISHED_TEXT
+        elif quest.terminal[scene]:
+            text = "Конец квеста"
+        else:
+            text = "Подготовьтесь... Анализ эмоций начнется через 3 секунды"
+        self.quest_timer_label.config(text=text, foreground=self.COLORS['accent'])
+
+        if self.quest_window.state() == 'withdrawn':
+            self.quest_window.deiconify()
+        self.quest_window.grab_set()
+
+        # Пока игрок читает сцену, в фоне готовятся картинки следующих
+        self.quest_images.prefetch(quest.assets[scene])
+
+        elapsed = (time.monotonic() - started) * 1000.0
+        self.quest_switch_times.append(elapsed)
+        self.metrics.record('quest_scene_switch', elapsed)
+
     def start_emotion_quest(self):
-        self.game_active = True
-        self.quest_stage = 0
-        self.show_quest_scene()
-        threading.Thread(target=self.quest_logic).start()
+        if not self.quest:
+            self._set_status("Квесты не найдены")
+            return
+        self.quest_scene = self.quest.start
+        self.quest_switch_times = []
+        finished = False
+        try:
+            finished = self.quest_logic()
+        finally:
+            times = self.quest_switch_times
+            if times:
+                print(f"Смена сцены квеста: среднее {sum(times) / len(times):.1f} мс, "
+                      f"макс. {max(times):.1f} мс, картинки из кэша {self.quest_images.hits}, "
+                      f"загружены при показе {self.quest_images.misses}")
+            # Последняя сцена пройденного квеста остается на экране
+            if not finished:
+                self.root.after(0, self._hide_quest_window)
 
     def quest_logic(self):
-        while self.game_active and self.quest_stage in self.quest_scenes:
-            current_scene = self.quest_scenes[self.quest_stage]
-            required_emotions = current_scene['emotions'].keys()
+        """Сцены квеста по порядку; True, если дошли до финала, False - до тупика"""
+        quest = self.quest
+        while True:
+            scene = self.quest_scene
 
             # Показываем сцену
             self.root.after(0, self.show_quest_scene)
 
+            # Тупик - ошибка в файле квеста, а не победа: сцена видна
+            # несколько секунд, затем окно квеста закрывается
+            if scene in quest.dead_ends:
+                print(f"Квест {quest.id}: тупик в сцене {quest.stages[scene]}")
+                self._set_status("Эта ветка квеста не закончена. Нажмите 'Начать анализ' "
+                                 "для повторения.")
+                self.games.sleep(3)
+                return False
+
+            # Финал: переходов из сцены нет
+            if quest.terminal[scene]:
+                self._set_status("Квест завершен! Нажмите 'Начать анализ' для повторения.")
+                return True
+
             # Даем 3 секунды на чтение сцены перед началом анализа
-            time.sleep(3)
+            self.games.sleep(3)
 
             # Обновляем сообщение о начале анализа
             self.root.after(0, lambda: self.quest_timer_label.config(
@@ -751,57 +1081,84 @@ class NeoFlexEmotionGame:
             ))
 
             # Даем 10 секунд на реакцию
-            start_time = time.time()
             reaction_time = 10
-            success = False
-
-            while (time.time() - start_time) < reaction_time and self.game_active:
-                if self.current_emotion in required_emotions:
-                    next_stage = current_scene['emotions'][self.current_emotion]
-                    self.quest_stage = next_stage
-                    success = True
-                    break
+            deadline = time.monotonic() + reaction_time
+            next_scene = NO_SCENE
+
+            sequence = self.notifier.sequence
+            while time.monotonic() < deadline:
+                sequence, result = self._wait_result(sequence, deadline)
+                # Переход - обращение к таблице по номерам сцены и эмоции
+                label = result.stable_label if result else None
+                if label is not None:
+                    next_scene = quest.next_scene(scene, label)
+                    if next_scene != NO_SCENE:
+                        break
 
                 # Обновляем оставшееся время
-                remaining = int(reaction_time - (time.time() - start_time))
+                remaining = max(0, int(deadline - time.monotonic()))
                 self.root.after(0, lambda r=remaining: self.quest_timer_label.config(
                     text=f"Осталось времени: {r} сек",
                     foreground='red' if r < 5 else self.COLORS['accent']
                 ))
-                time.sleep(0.1)
 
-            if success:
-                if current_scene.get('final', False):
-                    self.root.after(0, lambda: self.status_var.set(
-                        "Квест завершен! Нажмите 'Начать анализ' для повторения."))
-                    self.game_active = False
-                    break
-                else:
-                    self.root.after(0, lambda: self.status_var.set("Успешно! Переход к следующей сцене..."))
-                    time.sleep(2)  # Пауза перед следующей сценой
+            if next_scene != NO_SCENE:
+                self.quest_scene = next_scene
+                self._set_status("Успешно! Переход к следующей сцене...")
+                self.games.sleep(2)  # Пауза перед следующей сценой
             else:
-                self.root.after(0, lambda: self.status_var.set(
-                    f"Время вышло! Попробуйте еще раз с начала квеста."
-                ))
-                self.quest_stage = 0  # Начинаем заново
-                time.sleep(3)
+                self._set_status("Время вышло! Попробуйте еще раз с начала квеста.")
+                self.quest_scene = quest.start  # Начинаем заново
+                self.games.sleep(3)
 
-        if not current_scene.get('final', False):
-            self.game_active = False
-            if self.quest_window:
-                self.quest_window.destroy()
-            self.status_var.set("Квест завершен! Спасибо за игру!")
+    def exit(self):
+        # На станции выход из любой кабины закрывает все (см. station.py)
+        if self.on_exit:
+            self.on_exit()
+        else:
+            self.stop()
 
     def stop(self):
         self._stop_event.set()
-        self.cap.release()
+        self.games.stop()
+        self.inference.stop()
+        if self.stream:
+            self.stream.stop()
+        for exporter in self.metrics_exporters:
+            exporter.stop()
+        if self.owns_engine and isinstance(self.engine, RemoteEngine):
+            self.engine.stop()
+        if self.cap:
+            self.cap.release()
+        self.quest_images.stop()
         if self.quest_window:
             self.quest_window.destroy()
         self.root.destroy()
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="NeoFlex Emotion AI")
+    parser.add_argument('--config', default='config.json',
+                        help="JSON-файл с настройками")
+    parser.add_argument('--import-report', action='store_true',
+                        help="вывести время импорта модулей после загрузки моделей")
+    parser.add_argument('--record', metavar='DIR', help="записать сессию в папку")
+    parser.add_argument('--replay', metavar='DIR', help="воспроизвести записанную сессию вместо камеры")
+    parser.add_argument('--replay-speed', type=float,
+                        help="скорость воспроизведения (1.0 - как при записи, по умолчанию без пауз)")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.record:
+        config['recording']['path'] = args.record
+    if args.replay:
+        config['replay']['path'] = args.replay
+    if args.replay_speed:
+        config['replay']['speed'] = args.replay_speed
+
     root = tk.Tk()
-    app = NeoFlexEmotionGame(root)
+    app = NeoFlexEmotionGame(root, config)
     root.protocol("WM_DELETE_WINDOW", app.stop)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""Бэкенды модели эмоций
+
+keras        - исходная модель DeepFace через TensorFlow
+tflite       - экспорт той же модели в TFLite, float32
+tflite-int8  - полностью целочисленная квантованная TFLite-модель
+
+Экспорт делает convert_model.py. Допуск точности относительно keras
+проверяется командой `python convert_model.py compare`:
+для tflite разница вероятностей не больше FLOAT_TOLERANCE, для
+tflite-int8 совпадение доминирующей эмоции не ниже INT8_MIN_AGREEMENT
+и средняя разница вероятностей не больше INT8_MEAN_TOLERANCE.
+"""
+import os
+
+import numpy as np
+
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+TFLITE_FLOAT_PATH = os.path.join(MODELS_DIR, 'emotion_float32.tflite')
+TFLITE_INT8_PATH = os.path.join(MODELS_DIR, 'emotion_int8.tflite')
+
+FLOAT_TOLERANCE = 1e-4
+INT8_MIN_AGREEMENT = 0.95
+INT8_MEAN_TOLERANCE = 0.02
+
+
+class KerasBackend:
+    name = 'keras'
+
+    def __init__(self, model=None, **kwargs):
+        if model is None:
+            from classifier import load_emotion_model
+            model = load_emotion_model()
+        self.model = model
+
+    def predict(self, batch):
+        # Прямой вызов модели без накладных расходов Model.predict
+        return np.asarray(self.model(batch, training=False))
+
+
+def _make_interpreter(model_path, num_threads=None):
+    # Легкий tflite_runtime, если установлен, иначе интерпретатор из TensorFlow
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=model_path, num_threads=num_threads)
+
+
+class TFLiteBackend:
+    name = 'tflite'
+
+    def __init__(self, model_path=None, num_threads=None, **kwargs):
+        model_path = model_path or TFLITE_FLOAT_PATH
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"Нет модели {model_path}, создайте ее: python convert_model.py convert")
+
+        self.interpreter = _make_interpreter(model_path, num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+
+        # Параметры квантования входа и выхода (для int8-модели)
+        self._input_scale, self._input_zero = self._input['quantization']
+        self._output_scale, self._output_zero = self._output['quantization']
+        self.quantized = self._input['dtype'] == np.int8
+
+    def _resize(self, batch_size):
+        if batch_size == self._batch_size:
+            return
+        shape = list(self._input['shape'])
+        shape[0] = batch_size
+        self.interpreter.resize_tensor_input(self._input['index'], shape)
+        self.interpreter.allocate_tensors()
+        self._batch_size = batch_size
+
+    def predict(self, batch):
+        self._resize(len(batch))
+
+        if self.quantized:
+            batch = np.round(batch / self._input_scale + self._input_zero)
+            batch = np.clip(batch, -128, 127).astype(np.int8)
+
+        self.interpreter.set_tensor(self._input['index'], batch)
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self._output['index'])
+
+        if self._output['dtype'] == np.int8:
+            output = (output.astype(np.float32) - self._output_zero) * self._output_scale
+        return output
+
+
+class TFLiteInt8Backend(TFLiteBackend):
+    name = 'tflite-int8'
+
+    def __init__(self, model_path=None, num_threads=None, **kwargs):
+        super().__init__(model_path or TFLITE_INT8_PATH, num_threads)
+
+
+BACKENDS = {
+    KerasBackend.name: KerasBackend,
+    TFLiteBackend.name: TFLiteBackend,
+    TFLiteInt8Backend.name: TFLiteInt8Backend,
+}
+
+
+def create_backend(name='keras', **kwargs):
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Неизвестный бэкенд модели эмоций: {name}")
+    return backend_class(**kwargs)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Объединение одновременных запросов в один вызов модели
+
+    Первый запрос в очереди ждет попутчиков не дольше max_wait секунд,
+    затем накопленные (не больше max_batch) обрабатываются одним вызовом
+    process_fn(items) -> список результатов в том же порядке.
+    """
+
+    def __init__(self, process_fn, max_batch=8, max_wait=0.01):
+        self.process_fn = process_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+        # Статистика: число вызовов модели и обработанных элементов
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item, timeout=None):
+        return self.submit(item).result(timeout)
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join(1.0)
+
+    def _collect(self):
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            items = [item for item, future in batch]
+            try:
+                results = self.process_fn(items)
+            except Exception as e:
+                for item, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(items)
+            for (item, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""Сравнение EmotionClassifier с DeepFace.analyze(detector_backend='skip')
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_classifier [--faces 100] [--batch 1 2 4 8]
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import measure, summarize
+from classifier import EmotionClassifier
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--faces', type=int, default=100)
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    faces = [rng.integers(0, 256, (160, 160, 3), dtype=np.uint8) for _ in range(args.faces)]
+    classifier = EmotionClassifier()
+
+    for size in args.batch:
+        batches = [faces[i:i + size] for i in range(0, len(faces) - size + 1, size)]
+        summarize(f"EmotionClassifier.predict ({size})",
+                  measure(classifier.predict, batches), size)
+
+    from deepface import DeepFace
+
+    def deepface_analyze(face):
+        DeepFace.analyze(face, actions=['emotion'], enforce_detection=False,
+                         detector_backend='skip', silent=True)
+
+    summarize("DeepFace.analyze (skip)", measure(deepface_analyze, faces))
+
+
+if __name__ == '__main__':
+    main()
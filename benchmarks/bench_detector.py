@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Сравнение детектора cv2.dnn с DeepFace.analyze(detector_backend='ssd')
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_detector [--source папка|видео] [--frames 50]
+"""
+import argparse
+
+import cv2
+
+from benchmarks.common import load_frames, measure, summarize
+from detector import FaceDetector
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--source', help="папка с изображениями или видеофайл")
+    parser.add_argument('--frames', type=int, default=50)
+    parser.add_argument('--batch', type=int, default=4)
+    parser.add_argument('--skip-deepface', action='store_true')
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames)
+    detector = FaceDetector()
+
+    summarize("FaceDetector.detect", measure(detector.detect, frames))
+
+    batches = [frames[i:i + args.batch] for i in range(0, len(frames), args.batch)]
+    summarize(f"FaceDetector.detect_batch ({args.batch})",
+              measure(detector.detect_batch, batches), args.batch)
+
+    if args.skip_deepface:
+        return
+
+    from deepface import DeepFace
+
+    def deepface_analyze(frame):
+        # Прежний путь process_frame: уменьшение вдвое и полный analyze
+        small_frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
+        DeepFace.analyze(small_frame, actions=['emotion'], enforce_detection=False,
+                         detector_backend='ssd', silent=True)
+
+    def deepface_detect(frame):
+        DeepFace.extract_faces(frame, detector_backend='ssd', enforce_detection=False)
+
+    summarize("DeepFace.analyze (ssd, emotion)", measure(deepface_analyze, frames))
+    summarize("DeepFace.extract_faces (ssd)", measure(deepface_detect, frames))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Рывки интерфейса при анализе в потоке и в отдельном процессе
+
+Главный поток имитирует цикл Tk: раз в --tick мс немного работы на Python
+(как отрисовка кадра). Параллельно фоновый поток анализирует кадры: в
+режиме thread через EmotionEngine в этом же процессе, в режиме process
+через RemoteEngine (см. worker.py). Для каждого режима печатается
+опоздание тиков (p50 / p99 / разброс) и частота анализа.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_isolation [--modes thread process] [--duration 10]
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.common import load_frames
+from config import load_config
+from engine import EmotionEngine
+from worker import RemoteEngine
+
+
+def ui_ticks(duration, tick):
+    """Опоздания тиков цикла интерфейса, мс"""
+    lateness = []
+    work = list(range(2000))
+    deadline = time.monotonic() + tick
+    finished = time.monotonic() + duration
+    while deadline < finished:
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        now = time.monotonic()
+        lateness.append(max(0.0, now - deadline) * 1000.0)
+        # Немного работы с GIL, как у обработчика after()
+        sum(v * v for v in work)
+        deadline = max(deadline + tick, now)
+    return lateness
+
+
+def run_mode(engine, frames, duration, tick):
+    stop = threading.Event()
+    analyzed = [0]
+
+    def analysis():
+        i = 0
+        while not stop.is_set():
+            frame = frames[i % len(frames)]
+            boxes, scores = engine.detect(frame)
+            if len(boxes):
+                engine.classify_regions(frame, boxes[:1])
+            analyzed[0] += 1
+            i += 1
+
+    thread = threading.Thread(target=analysis, daemon=True)
+    thread.start()
+    lateness = ui_ticks(duration, tick)
+    stop.set()
+    thread.join()
+    return lateness, analyzed[0] / duration
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--source', help="папка с изображениями или видеофайл")
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--modes', nargs='+', default=['thread', 'process'],
+                        choices=['idle', 'thread', 'process'])
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--tick', type=float, default=16.0, help="период тика интерфейса, мс")
+    args = parser.parse_args()
+
+    config = load_config(None)
+    frames = load_frames(args.source, args.frames)
+    tick = args.tick / 1000.0
+
+    for mode in args.modes:
+        if mode == 'idle':
+            # Опоздания без анализа: уровень шума таймера
+            lateness, rate = ui_ticks(args.duration, tick), 0.0
+        else:
+            engine = RemoteEngine(config) if mode == 'process' else EmotionEngine(config)
+            engine.load()
+            try:
+                lateness, rate = run_mode(engine, frames, args.duration, tick)
+            finally:
+                if mode == 'process':
+                    engine.stop()
+
+        values = np.array(lateness)
+        print(f"{mode:8s}: опоздание тика p50 {np.percentile(values, 50):6.2f} мс, "
+              f"p99 {np.percentile(values, 99):6.2f} мс, "
+              f"разброс {statistics.pstdev(lateness):6.2f} мс, "
+              f"анализ {rate:5.1f} кадр./с")
+
+
+if __name__ == '__main__':
+    main()
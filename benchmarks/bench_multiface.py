@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Стоимость анализа кадра с 1, 2 и 4 лицами
+
+Детекция выполняется один раз на кадр, все лица классифицируются одним
+батчем; для сравнения показана классификация лиц по одному.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_multiface [--frames 30] [--faces 1 2 4]
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import load_frames, measure, summarize
+from config import load_config
+from engine import EmotionEngine
+
+
+def face_boxes(count, width, height):
+    # Лица фиксированного размера, равномерно по ширине кадра
+    size = min(width // count, height) // 2
+    step = width // count
+    return np.array([[i * step + (step - size) // 2, (height - size) // 2, size, size]
+                     for i in range(count)], dtype=np.int32)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--source', help="папка с изображениями или видеофайл")
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--faces', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames)
+    engine = EmotionEngine(load_config(None))
+    engine.load()
+
+    height, width = frames[0].shape[:2]
+    for count in args.faces:
+        boxes = face_boxes(count, width, height)
+
+        def batched(frame):
+            engine.detect(frame)
+            engine.classify_regions(frame, boxes)
+
+        def sequential(frame):
+            engine.detect(frame)
+            for box in boxes:
+                engine.classify_regions(frame, box[None])
+
+        summarize(f"{count} лиц(а), один батч", measure(batched, frames))
+        summarize(f"{count} лиц(а), по одному", measure(sequential, frames))
+
+
+if __name__ == '__main__':
+    main()
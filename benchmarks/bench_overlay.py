@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Стоимость отрисовки надписей на кадре: прежний путь через PIL и OverlayRenderer
+
+Строка задержки меняется почти каждый кадр. Сравниваются вариант, где ее
+текст новый на каждом кадре (промах кэша надписей), и обновление дважды
+в секунду, как в игре (при 30 fps - раз в 15 кадров).
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_overlay [--frames 200]
+"""
+import argparse
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from benchmarks.common import load_frames, measure, summarize
+from overlay import OverlayRenderer
+
+
+COLORS = {
+    'primary': '#00305E',
+    'secondary': '#005C97',
+    'accent': '#FF6B35',
+    'text': '#2D3436'
+}
+
+REGION = (260, 140, 160, 160)
+
+# Кадров между обновлениями строки задержки: 0.5 с при 30 fps
+LATENCY_REFRESH = 15
+
+
+def latency_text(index):
+    return (f"Задержка анализа: {index % 3} кадр. / {40 + index % 37} мс | "
+            f"экран: {28 + index % 3} fps, пропущено {index // 7}, "
+            f"от камеры {60 + index % 23} мс")
+
+
+def hex_to_rgb(hex_color):
+    hex_color = hex_color.lstrip('#')
+    return tuple(int(hex_color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def legacy_overlay(frame, index):
+    # Прежний process_frame: шрифт на каждый кадр, BGR -> PIL -> BGR
+    pil_img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    draw = ImageDraw.Draw(pil_img)
+    try:
+        font = ImageFont.truetype("arial.ttf", 24)
+    except OSError:
+        try:
+            font = ImageFont.truetype("DejaVuSans.ttf", 24)
+        except OSError:
+            font = ImageFont.load_default()
+
+    x, y, w, h = REGION
+    draw.rectangle([(x, y), (x + w, y + h)], outline=hex_to_rgb(COLORS['accent']), width=2)
+    draw.text((20, frame.shape[0] - 40), "Цель: РАДОСТЬ", font=font,
+              fill=hex_to_rgb(COLORS['primary']))
+    draw.text((20, 60), "Текущая: РАДОСТЬ", font=font, fill=hex_to_rgb(COLORS['secondary']))
+    draw.text((frame.shape[1] - 250, 100), "Счет: 1 - 2", font=font,
+              fill=hex_to_rgb(COLORS['secondary']))
+    draw.text((frame.shape[1] - 200, 140), "Раунд 2/3", font=font,
+              fill=hex_to_rgb(COLORS['primary']))
+    draw.text((20, 20), latency_text(index), font=font, fill=hex_to_rgb(COLORS['text']))
+    return cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=200)
+    args = parser.parse_args()
+
+    frames = load_frames(None, args.frames)
+    renderer = OverlayRenderer(COLORS)
+
+    def cached_overlay(frame, latency):
+        canvas = frame.copy()
+        renderer.rectangle(canvas, REGION, 'accent')
+        renderer.text(canvas, (20, frame.shape[0] - 40), "Цель: РАДОСТЬ", 'primary')
+        renderer.text(canvas, (20, 60), "Текущая: РАДОСТЬ", 'secondary')
+        renderer.text(canvas, (frame.shape[1] - 250, 100), "Счет: 1 - 2", 'secondary')
+        renderer.text(canvas, (frame.shape[1] - 200, 140), "Раунд 2/3", 'primary')
+        renderer.text(canvas, (20, 20), latency, 'text')
+        return canvas
+
+    def counted(render):
+        # Номер кадра для текста строки задержки
+        index = iter(range(10 ** 9))
+        return lambda frame: render(frame, next(index))
+
+    summarize("до: PIL, шрифт на каждый кадр",
+              measure(counted(legacy_overlay), frames))
+    summarize("OverlayRenderer, задержка каждый кадр",
+              measure(counted(lambda frame, i: cached_overlay(frame, latency_text(i))), frames))
+    summarize(f"после: задержка раз в {LATENCY_REFRESH} кадров",
+              measure(counted(lambda frame, i: cached_overlay(
+                  frame, latency_text(i - i % LATENCY_REFRESH))), frames))
+
+
+if __name__ == '__main__':
+    main()
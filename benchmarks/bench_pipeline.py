@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""Покадровый прогон конвейера по записанному видео с замером каждого этапа
+
+Кадры берутся из видеофайла или папки с изображениями вместо камеры и
+проходят тот же код, что и в игре: анализ FrameAnalyzer (трекер, детектор,
+классификатор), подписи render_game_overlay и FrameConverter окна. Этапы:
+
+    capture         - чтение кадра из источника
+    gating          - проверка изменения кадра (с --gating)
+    resize          - подготовка кадра для детектора (масштаб, среднее)
+    detection       - детектор целиком: resize, сеть и разбор рамок
+    tracking        - перенос рамки трекером между детекциями
+    face_preprocess - вырезка лица, серый, 48x48
+    classification  - классификатор целиком: face_preprocess и модель эмоций
+    overlay         - отрисовка подписей на копии кадра
+    display         - масштабирование под окно и BGR -> RGB
+
+Результаты пишутся в JSON и сравниваются с прошлым прогоном. Без камеры и
+дисплея, на CPU. Запуск из корня репозитория:
+
+    python -m benchmarks.bench_pipeline --make-fixture fixtures/one_face.avi [--faces 1]
+    python -m benchmarks.bench_pipeline --source fixtures/*.avi --output new.json
+                                        [--baseline old.json] [--tolerance 0.15]
+
+В папке fixtures лежат готовые ролики 320x240: one_face.avi и
+two_faces.avi с рисованными лицами (детекция, трекинг и классификация) и
+empty.avi без лиц (простой).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from analysis import FrameAnalyzer
+from benchmarks.common import iter_frames, make_fixture
+from classifier import EMOTION_LABELS
+from config import load_config
+from engine import EmotionEngine
+from framebuffer import FrameConverter
+from gating import FrameGate
+from overlay import OverlayRenderer, render_game_overlay
+from tracker import FaceTracker
+
+
+STAGES = ('capture', 'gating', 'resize', 'detection', 'tracking', 'face_preprocess',
+          'classification', 'overlay', 'display')
+
+COLORS = {
+    'primary': '#00305E',
+    'secondary': '#005C97',
+    'accent': '#FF6B35',
+    'text': '#2D3436'
+}
+
+# Разница медиан меньше этой считается шумом, мс
+NOISE_FLOOR_MS = 0.05
+
+# Часы записи для FrameGate: кадры идут с частотой камеры
+SOURCE_FPS = 30.0
+
+# Строка задержки в игре обновляется дважды в секунду
+LATENCY_REFRESH = int(SOURCE_FPS / 2)
+
+
+def label_name(probabilities):
+    return EMOTION_LABELS[int(np.argmax(probabilities))]
+
+
+class StageEngine:
+    """EmotionEngine с отдельным замером подготовки входа детектора и лиц"""
+
+    def __init__(self, engine, run):
+        self.engine = engine
+        self.ready = engine.ready
+        self.run = run
+
+    def detect(self, frame):
+        detector = self.engine.detector
+        sizes = np.array([frame.shape[1::-1]], dtype=np.float32)
+        blob = self.run.timed('resize', detector.preprocess, [frame])
+        return detector.infer(blob, sizes)[0]
+
+    def classify_regions(self, frame, boxes):
+        classifier = self.engine.classifier
+        faces = [frame[y:y + h, x:x + w] for x, y, w, h in boxes]
+        batch = self.run.timed('face_preprocess', classifier.preprocess, faces)
+        return classifier.backend.predict(batch)
+
+
+class PipelineRun:
+    """Один проход источника через этапы конвейера"""
+
+    def __init__(self, engine, config, display_size, gating=False):
+        self.renderer = OverlayRenderer(COLORS)
+        self.converter = FrameConverter()
+        self.converter.target_size = display_size
+
+        tracking = config['tracking']
+        tracker = FaceTracker(detect_interval=tracking['detect_interval'],
+                              min_confidence=tracking['min_confidence']) \
+            if tracking['enabled'] else None
+        # Этапы tracking, detection и classification пишет само ядро анализа
+        self.analyzer = FrameAnalyzer(StageEngine(engine, self), label_name, tracker,
+                                      metrics=self)
+
+        gate = config['gating']
+        self.gate = FrameGate(size=gate['size'], pixel_threshold=gate['pixel_threshold'],
+                              changed_fraction=gate['changed_fraction'],
+                              refresh_interval=gate['refresh_interval'],
+                              idle_after=gate['idle_after'],
+                              idle_interval=gate['idle_interval']) if gating else None
+
+        self.timings = {name: [] for name in STAGES}
+        self.timings['total'] = []
+        self.faces = 0
+
+    def timed(self, name, fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        self.timings[name].append((time.perf_counter() - started) * 1000.0)
+        return result
+
+    # Интерфейс Metrics для FrameAnalyzer
+    def start(self):
+        return time.perf_counter()
+
+    def observe(self, name, started):
+        self.timings[name].append((time.perf_counter() - started) * 1000.0)
+
+    def analyze(self, frame):
+        result = self.analyzer.analyze(frame)
+        if result.region is not None:
+            self.faces += 1
+        return result.region, result.emotion
+
+    def render(self, frame, region, emotion, latency):
+        # Самый насыщенный кадр игры: режим дуэли
+        return render_game_overlay(self.renderer, frame, region=region, target="радость",
+                                   current=emotion or "Лицо не обнаружено", latency=latency,
+                                   duel=("Игрок 1", (1, 2), 2))
+
+    def run(self, source, limit, warmup):
+        frames = iter_frames(source, limit + warmup)
+        count = 0
+        started = None
+        cpu_started = None
+        region, emotion = None, None
+        latency = ""
+        while True:
+            frame = self.timed('capture', next, frames, None)
+            if frame is None:
+                self.timings['capture'].pop()
+                break
+
+            frame_started = time.perf_counter()
+            analyze = True
+            if self.gate:
+                # Неизменный кадр повторяет прошлый результат, как в приложении
+                analyze = self.timed('gating', self.gate.update, frame, count / SOURCE_FPS,
+                                     region is not None, False)
+            if analyze:
+                region, emotion = self.analyze(frame)
+            if count % LATENCY_REFRESH == 0:
+                latency_ms = (time.perf_counter() - frame_started) * 1000.0
+                latency = f"Задержка анализа: 0 кадр. / {latency_ms:.0f} мс"
+            canvas = self.timed('overlay', self.render, frame, region, emotion, latency)
+            self.timed('display', self.converter.convert, canvas)
+            self.timings['total'].append((time.perf_counter() - frame_started) * 1000.0
+                                         + self.timings['capture'][-1])
+
+            count += 1
+            if count == warmup:
+                # Первые кадры (открытие файла, выделение буферов) в статистику не идут
+                for values in self.timings.values():
+                    values.clear()
+                self.faces = 0
+                if self.gate:
+                    self.gate.analyzed = self.gate.skipped = 0
+                started = time.perf_counter()
+                cpu_started = time.process_time()
+
+        if started is None or not self.timings['total']:
+            raise SystemExit(f"Слишком мало кадров в источнике: {source}")
+        elapsed = time.perf_counter() - started
+        run = summarize_run(self.timings, len(self.timings['total']), self.faces, elapsed)
+        run['cpu_ms_per_frame'] = (time.process_time() - cpu_started) * 1000.0 / run['frames']
+        if self.gate:
+            run['skipped_fraction'] = self.gate.skipped_fraction
+        return run
+
+
+def stage_stats(timings, frames):
+    timings = np.array(timings)
+    return {
+        'count': int(len(timings)),
+        'per_frame': len(timings) / frames,
+        'mean_ms': float(timings.mean()),
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p90_ms': float(np.percentile(timings, 90)),
+        'p99_ms': float(np.percentile(timings, 99)),
+        'max_ms': float(timings.max()),
+    }
+
+
+def summarize_run(timings, frames, faces, elapsed):
+    return {
+        'frames': frames,
+        'faces': faces,
+        'fps': frames / elapsed,
+        'stages': {name: stage_stats(values, frames)
+                   for name, values in timings.items() if values},
+    }
+
+
+def environment(config):
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'backend': config['classifier']['backend'],
+        'detector_input': list(config['detector']['input_size']),
+        'tracking': config['tracking']['enabled'],
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def print_run(name, run):
+    print(f"\n{name}: {run['frames']} кадров, {run['faces']} лиц, {run['fps']:.1f} кадр./с, "
+          f"CPU {run['cpu_ms_per_frame']:.1f} мс/кадр")
+    if 'skipped_fraction' in run:
+        print(f"анализ пропущен для {100.0 * run['skipped_fraction']:.0f}% кадров")
+    print(f"{'этап':<16} {'кадров':>7} {'mean, мс':>9} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for stage, stats in run['stages'].items():
+        print(f"{stage:<16} {stats['count']:7d} {stats['mean_ms']:9.2f} {stats['p50_ms']:8.2f} "
+              f"{stats['p90_ms']:8.2f} {stats['p99_ms']:8.2f} {stats['max_ms']:8.2f}")
+
+
+def compare(results, baseline, tolerance):
+    """Сравнение медиан этапов с прошлым прогоном; возвращает число регрессий"""
+    regressions = 0
+    for name, run in results['runs'].items():
+        base_run = baseline.get('runs', {}).get(name)
+        if not base_run:
+            print(f"\n{name}: нет в базовом прогоне")
+            continue
+
+        print(f"\n{name}: сравнение с базовым прогоном (p50)")
+        for stage, stats in run['stages'].items():
+            base = base_run['stages'].get(stage)
+            if not base:
+                continue
+            old, new = base['p50_ms'], stats['p50_ms']
+            change = (new - old) / old if old else 0.0
+            regressed = new - old > NOISE_FLOOR_MS and change > tolerance
+            regressions += regressed
+            print(f"{stage:<16} {old:8.2f} -> {new:8.2f} мс {change * 100:+7.1f}%"
+                  f"{'  РЕГРЕССИЯ' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--source', nargs='+', help="видеофайлы или папки с изображениями")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--config', default=None)
+    parser.add_argument('--display-size', type=int, nargs=2, default=[800, 600])
+    parser.add_argument('--gating', action='store_true',
+                        help="пропускать анализ неизменных кадров (см. gating.py)")
+    parser.add_argument('--output', help="файл JSON с результатами")
+    parser.add_argument('--baseline', help="JSON прошлого прогона для сравнения")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="допустимый рост медианы этапа, доля")
+    parser.add_argument('--make-fixture', metavar='PATH',
+                        help="записать короткий ролик (из --source или синтетический) и выйти")
+    parser.add_argument('--fixture-frames', type=int, default=90)
+    parser.add_argument('--faces', type=int, default=1,
+                        help="число рисованных лиц в синтетическом ролике")
+    args = parser.parse_args()
+
+    if args.make_fixture:
+        directory = os.path.dirname(args.make_fixture)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        source = args.source[0] if args.source else None
+        written = make_fixture(args.make_fixture, source, frames=args.fixture_frames,
+                               faces=args.faces)
+        print(f"{args.make_fixture}: {written} кадров")
+        return
+
+    config = load_config(args.config)
+    engine = EmotionEngine(config)
+    engine.load()
+
+    results = {'environment': environment(config), 'runs': {}}
+    for source in args.source or [None]:
+        name = os.path.basename(source.rstrip('/\\')) if source else 'synthetic'
+        run = PipelineRun(engine, config, tuple(args.display_size), gating=args.gating)
+        results['runs'][name] = run.run(source, args.frames, args.warmup)
+        print_run(name, results['runs'][name])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
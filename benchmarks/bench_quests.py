@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Загрузка и компиляция квестов и переход по эмоции
+
+Генерирует --quests случайных квестов по --scenes сцен во временной папке и
+измеряет открытие папки (QuestLibrary, как при запуске игры), компиляцию
+одного квеста и всех сразу (проверка), а также сравнивает переход по
+таблице с прежним поиском по словарю сцен со строковыми ключами эмоций.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_quests [--quests 300] [--scenes 40]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from classifier import EMOTION_LABELS
+from quest_graph import NO_SCENE, QuestLibrary, label_ids
+
+
+def make_quest(scenes, rng):
+    data = {}
+    for stage in range(scenes):
+        final = stage >= scenes - 3
+        emotions = {} if final else {
+            label: rng.randrange(stage + 1, scenes)
+            for label in rng.sample(EMOTION_LABELS, rng.randint(1, 4))}
+        data[str(stage)] = {'text': f"Сцена {stage}", 'image': f'scene_{stage}.jpg',
+                            'emotions': emotions, 'final': final}
+    return {'start': 0, 'scenes': data}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--quests', type=int, default=300)
+    parser.add_argument('--scenes', type=int, default=40)
+    parser.add_argument('--lookups', type=int, default=200000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    labels = label_ids(EMOTION_LABELS, {})
+    with tempfile.TemporaryDirectory() as directory:
+        raw = []
+        for i in range(args.quests):
+            data = make_quest(args.scenes, rng)
+            raw.append(data)
+            with open(os.path.join(directory, f'quest_{i:04d}.json'), 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+
+        started = time.perf_counter()
+        library = QuestLibrary(directory, labels, len(EMOTION_LABELS))
+        opened = time.perf_counter() - started
+        started = time.perf_counter()
+        quest = library.load(library.ids[0])
+        first = time.perf_counter() - started
+        started = time.perf_counter()
+        library.check()
+        checked = time.perf_counter() - started
+    print(f"{len(library)} квестов по {args.scenes} сцен: открытие папки {opened * 1000.0:.2f} мс, "
+          f"первый квест {first * 1000.0:.2f} мс, проверка всех {checked * 1000.0:.0f} мс")
+
+    scenes = raw[0]['scenes']
+    probes = [(rng.randrange(len(quest)), rng.randrange(len(EMOTION_LABELS)))
+              for _ in range(args.lookups)]
+
+    started = time.perf_counter()
+    for scene, label in probes:
+        quest.next_scene(scene, label) != NO_SCENE
+    table = time.perf_counter() - started
+
+    # Прежний путь: словарь сцены и проверка строки эмоции
+    names = [(str(quest.stages[scene]), EMOTION_LABELS[label]) for scene, label in probes]
+    started = time.perf_counter()
+    for stage, emotion in names:
+        current = scenes[stage]
+        if emotion in current['emotions'].keys():
+            current['emotions'][emotion]
+    legacy = time.perf_counter() - started
+
+    print(f"переход: таблица {table * 1e9 / args.lookups:.0f} нс, "
+          f"словарь сцен {legacy * 1e9 / args.lookups:.0f} нс")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Станция из нескольких камер: частота анализа на поток и память
+
+Каждый поток-камера подает кадры с частотой --camera-fps в общий
+InferenceScheduler. Для сравнения память одного процесса сопоставляется с
+оценкой для отдельных процессов на каждую камеру (процесс с моделью x N).
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_station [--streams 1 2 4 8] [--duration 10]
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.common import load_frames
+from config import load_config
+from engine import EmotionEngine
+from pipeline import AnalysisResult
+from station import InferenceScheduler
+
+
+def rss_mb():
+    """Резидентная память процесса, МБ"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    # Пиковое значение: в Linux в КБ, в macOS в байтах
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def build_result(frame, boxes, probabilities):
+    return AnalysisResult(faces=tuple(boxes))
+
+
+def run_level(engine, frames, count, duration, camera_fps, station):
+    scheduler = InferenceScheduler(engine, max_batch=station['max_batch'],
+                                   max_faces=station['max_faces'])
+    handles = [scheduler.register(str(i), build_result, max_fps=station['max_fps'])
+               for i in range(count)]
+    stop = threading.Event()
+
+    def camera(handle, offset):
+        interval = 1.0 / camera_fps
+        i = offset
+        while not stop.is_set():
+            handle.submit(i, time.monotonic(), frames[i % len(frames)])
+            i += 1
+            time.sleep(interval)
+
+    threads = [threading.Thread(target=camera, args=(handle, i), daemon=True)
+               for i, handle in enumerate(handles)]
+    scheduler.start()
+    for thread in threads:
+        thread.start()
+    started = time.monotonic()
+    time.sleep(duration)
+    elapsed = time.monotonic() - started
+    stop.set()
+    for thread in threads:
+        thread.join()
+    scheduler.stop()
+
+    rates = [handle.analyzed / elapsed for handle in handles]
+    batch = scheduler.frames / max(scheduler.batches, 1)
+    return rates, batch
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--source', help="папка с изображениями или видеофайл")
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--streams', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--camera-fps', type=float, default=30.0)
+    args = parser.parse_args()
+
+    config = load_config(None)
+    station = config['station']
+    frames = load_frames(args.source, args.frames)
+
+    base = rss_mb()
+    engine = EmotionEngine(config)
+    engine.load()
+    loaded = rss_mb()
+    print(f"Память: до загрузки {base:.0f} МБ, с моделью {loaded:.0f} МБ")
+
+    for count in args.streams:
+        rates, batch = run_level(engine, frames, count, args.duration, args.camera_fps, station)
+        shared = rss_mb()
+        print(f"{count} поток(а): анализ min {min(rates):5.1f} / mean {sum(rates) / count:5.1f} "
+              f"/ max {max(rates):5.1f} кадр./с, средний батч {batch:.1f}, "
+              f"память {shared:.0f} МБ против ~{loaded * count:.0f} МБ в отдельных процессах")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def iter_frames(source=None, limit=50, size=(640, 480)):
+    """Кадры BGR по одному из папки с изображениями, видеофайла, записанной
+    сессии или синтетические
+
+    Кадры читаются с диска по мере надобности, запись целиком в память не грузится.
+    """
+    count = 0
+    if source and os.path.exists(os.path.join(source, 'meta.json')):
+        # Записанная сессия (см. recording.py)
+        from recording import SessionReplay
+
+        replay = SessionReplay(source)
+        while count < limit:
+            ret, frame = replay.read()
+            if not ret:
+                break
+            count += 1
+            yield frame
+    elif source and os.path.isdir(source):
+        for path in sorted(glob.glob(os.path.join(source, '*'))):
+            if count >= limit:
+                break
+            if path.lower().endswith(IMAGE_EXTENSIONS):
+                image = cv2.imread(path)
+                if image is not None:
+                    count += 1
+                    yield image
+    elif source:
+        cap = cv2.VideoCapture(source)
+        try:
+            while count < limit:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                count += 1
+                yield frame
+        finally:
+            cap.release()
+    else:
+        rng = np.random.default_rng(0)
+        for _ in range(limit):
+            yield rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+
+
+def load_frames(source=None, limit=50, size=(640, 480)):
+    """Кадры BGR из папки с изображениями, видеофайла или синтетические"""
+    frames = list(iter_frames(source, limit, size))
+    if not frames:
+        raise SystemExit(f"Нет кадров в источнике: {source}")
+    return frames
+
+
+def draw_face(frame, center, size, smile=0.0):
+    """Рисованное лицо анфас, которое детектор res10 SSD находит с уверенностью
+    выше 0.9; size - половина ширины лица в пикселях"""
+    cx, cy = center
+    s = size
+
+    def px(value):
+        return max(1, int(value * s))
+
+    # Волосы, шея и овал лица
+    cv2.ellipse(frame, (cx, cy - px(0.15)), (px(0.62), px(0.8)), 0, 0, 360, (30, 40, 60), -1)
+    cv2.rectangle(frame, (cx - px(0.25), cy + px(0.5)), (cx + px(0.25), cy + px(1.3)),
+                  (120, 150, 200), -1)
+    cv2.ellipse(frame, (cx, cy), (px(0.5), px(0.68)), 0, 0, 360, (140, 170, 215), -1)
+    for side in (-1, 1):
+        ex, ey = cx + side * px(0.2), cy - px(0.12)
+        cv2.ellipse(frame, (ex, ey - px(0.13)), (px(0.14), px(0.035)), 0, 180, 360, (40, 50, 70), -1)
+        cv2.ellipse(frame, (ex, ey), (px(0.11), px(0.055)), 0, 0, 360, (235, 235, 235), -1)
+        cv2.circle(frame, (ex, ey), px(0.045), (60, 40, 30), -1)
+        cv2.circle(frame, (ex, ey), px(0.02), (10, 10, 10), -1)
+    cv2.line(frame, (cx, cy - px(0.05)), (cx - px(0.05), cy + px(0.15)), (100, 130, 180), px(0.03))
+    cv2.ellipse(frame, (cx, cy + px(0.3)), (px(0.18), px(0.05 + 0.08 * smile)), 0, 0, 180,
+                (80, 80, 170), max(2, px(0.04)))
+
+
+def make_fixture(path, source=None, frames=90, size=(320, 240), fps=15, faces=1):
+    """Короткий ролик MJPG для бенчмарков
+
+    Из записи source берутся первые frames кадров, уменьшенные до size; без
+    source рисуется синтетическая сцена: faces рисованных лиц (0 - пустой
+    кадр), которые медленно двигаются и улыбаются, на неровном фоне.
+    """
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, size)
+    if not writer.isOpened():
+        raise SystemExit(f"Не удалось создать файл: {path}")
+
+    written = 0
+    if source:
+        for frame in iter_frames(source, frames):
+            writer.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+            written += 1
+    else:
+        rng = np.random.default_rng(0)
+        width, height = size
+        # Фон - крупные пятна, чтобы ролик хорошо сжимался
+        background = cv2.resize(rng.integers(40, 140, (6, 8, 3), dtype=np.uint8), size,
+                                interpolation=cv2.INTER_CUBIC)
+        face_size = min(width // (2 * max(faces, 1) + 1), height // 4)
+        for i in range(frames):
+            phase = 2 * np.pi * i / max(frames, 1)
+            frame = background.copy()
+            for k in range(faces):
+                cx = int(width * (k + 0.5) / faces + 0.3 * face_size * np.sin(phase))
+                cy = int(height * 0.45 + 0.15 * face_size * np.cos(phase))
+                draw_face(frame, (cx, cy), face_size, smile=0.5 + 0.5 * np.sin(phase + k))
+            frame = cv2.GaussianBlur(frame, (0, 0), max(face_size / 40.0, 0.8))
+            writer.write(frame)
+            written += 1
+    writer.release()
+    return written
+
+
+def measure(fn, items, warmup=2):
+    """Время вызова fn на каждом элементе, мс"""
+    for item in items[:warmup]:
+        fn(item)
+
+    timings = []
+    for item in items:
+        started = time.perf_counter()
+        fn(item)
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return np.array(timings)
+
+
+def summarize(name, timings, items_per_call=1):
+    mean = timings.mean()
+    print(f"{name:<40} mean {mean:8.2f} мс  p50 {np.percentile(timings, 50):8.2f} мс  "
+          f"p99 {np.percentile(timings, 99):8.2f} мс  "
+          f"{1000.0 * items_per_call / mean:8.1f} изобр./с")
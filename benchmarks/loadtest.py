@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Нагрузочный тест HTTP-сервиса service.py
+
+Запуск из корня репозитория при работающем сервисе:
+    python -m benchmarks.loadtest [--url http://127.0.0.1:8000/analyze]
+                                  [--concurrency 1 4 16] [--duration 10]
+"""
+import argparse
+import sys
+import threading
+import time
+import urllib.request
+
+import cv2
+import numpy as np
+
+from benchmarks.common import load_frames
+
+
+def run_level(url, payloads, concurrency, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        i = offset
+        while time.monotonic() < deadline:
+            body = payloads[i % len(payloads)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                req = urllib.request.Request(url, data=body,
+                                             headers={'Content-Type': 'image/jpeg'})
+                with urllib.request.urlopen(req, timeout=30) as response:
+                    response.read()
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000.0)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    if not latencies:
+        # Ни одного успешного ответа: пропускной способности и задержки нет
+        print(f"клиентов {concurrency:3d}: {0.0:7.1f} запр./с  ОШИБКА: все {errors[0]} запросов "
+              f"завершились неудачно")
+        return False
+
+    latencies = np.array(latencies)
+    print(f"клиентов {concurrency:3d}: {len(latencies) / elapsed:7.1f} запр./с  "
+          f"p50 {np.percentile(latencies, 50):7.1f} мс  p99 {np.percentile(latencies, 99):7.1f} мс  "
+          f"ошибок {errors[0]}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://127.0.0.1:8000/analyze')
+    parser.add_argument('--source', help="папка с изображениями или видеофайл")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, 20)
+    payloads = [cv2.imencode('.jpg', frame)[1].tobytes() for frame in frames]
+    failed = [concurrency for concurrency in args.concurrency
+              if not run_level(args.url, payloads, concurrency, args.duration)]
+    if failed:
+        print(f"Уровни без успешных ответов: {failed}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
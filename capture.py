@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+
+import cv2
+
+
+def fourcc_name(code):
+    code = int(code)
+    return ''.join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00')
+
+
+class CameraCapture:
+    """Захват с камеры без устаревших кадров и с переподключением
+
+    Интерфейс как у cv2.VideoCapture (read, isOpened, release), поэтому
+    цикл камеры одинаково работает с камерой и с записью сессии.
+
+    При открытии запрашиваются формат fourcc, размер, частота и размер
+    буфера драйвера; что камера дала на самом деле, печатается. Перед
+    декодированием накопленные в буфере кадры пропускаются через grab:
+    кадр из буфера отдается почти мгновенно (быстрее drain_threshold), а
+    свежего приходится ждать. Декодируется (retrieve) только последний.
+    Время захвата - монотонное время возврата последнего grab.
+
+    Если кадры не читаются reconnect_after раз подряд, камера закрывается и
+    открывается заново с паузой от backoff до max_backoff секунд.
+    """
+
+    def __init__(self, source=0, width=640, height=480, fourcc='MJPG', fps=30,
+                 buffer_size=1, drain=True, drain_threshold=0.002, max_drain=5,
+                 reconnect_after=5, backoff=0.5, max_backoff=5.0):
+        self.source = source
+        self.width = width
+        self.height = height
+        self.fourcc = fourcc
+        self.fps = fps
+        self.buffer_size = buffer_size
+        # Файл отдает кадры сразу, пропуск "устаревших" съел бы видео
+        self.drain = drain and not (isinstance(source, str) and os.path.isfile(source))
+        self.drain_threshold = drain_threshold
+        self.max_drain = max_drain
+        self.reconnect_after = reconnect_after
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.cap = None
+        self.timestamp = None
+        self.connected = False
+        self.failures = 0
+        self.reconnects = 0
+        self.drained = 0
+        self._delay = 0.0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        if not self._open():
+            print(f"Камера {self.source} не открылась, повторные попытки...")
+
+    @classmethod
+    def from_config(cls, source, camera):
+        return cls(source, width=camera['width'], height=camera['height'],
+                   fourcc=camera['fourcc'], fps=camera['fps'],
+                   buffer_size=camera['buffer_size'], drain=camera['drain'],
+                   drain_threshold=camera['drain_threshold'], max_drain=camera['max_drain'],
+                   reconnect_after=camera['reconnect_after'], backoff=camera['backoff'],
+                   max_backoff=camera['max_backoff'])
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            cap.release()
+            return False
+
+        # FOURCC ставится до размера: иначе часть драйверов не даст 640x480 в MJPG
+        if self.fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        if self.width and self.height:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.fps:
+            cap.set(cv2.CAP_PROP_FPS, self.fps)
+        if self.buffer_size:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+
+        print(f"Камера {self.source}: {int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x"
+              f"{int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))} "
+              f"{fourcc_name(cap.get(cv2.CAP_PROP_FOURCC)) or '?'}, "
+              f"{cap.get(cv2.CAP_PROP_FPS):.0f} fps, "
+              f"буфер {int(cap.get(cv2.CAP_PROP_BUFFERSIZE))}")
+        self.cap = cap
+        self.connected = True
+        self.failures = 0
+        return True
+
+    def _close(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        self.connected = False
+
+    def _reconnect(self):
+        # Пауза растет, пока камера не вернется; release прерывает ожидание
+        self._delay = min(self._delay * 2, self.max_backoff) if self._delay else self.backoff
+        if self._stop_event.wait(self._delay):
+            return False
+        with self._lock:
+            if self._stop_event.is_set() or not self._open():
+                return False
+        self._delay = 0.0
+        self.reconnects += 1
+        print(f"Камера {self.source} переподключена")
+        return True
+
+    def _grab_latest(self):
+        started = time.monotonic()
+        ok = self.cap.grab()
+        finished = time.monotonic()
+        if self.drain:
+            drained = 0
+            # Мгновенный grab - кадр лежал в буфере, берем следующий
+            while ok and finished - started < self.drain_threshold and drained < self.max_drain:
+                started = finished
+                ok = self.cap.grab()
+                finished = time.monotonic()
+                drained += 1
+            self.drained += drained
+        self.timestamp = finished
+        return ok
+
+    def isOpened(self):
+        return self.connected
+
+    def read(self):
+        if self.cap is None and not self._reconnect():
+            return False, None
+
+        frame = None
+        with self._lock:
+            if self.cap is not None and self._grab_latest():
+                ok, frame = self.cap.retrieve()
+        if frame is not None:
+            self.failures = 0
+            return True, frame
+
+        self.failures += 1
+        if self.failures >= self.reconnect_after:
+            print(f"Камера {self.source} не отвечает, переподключение...")
+            with self._lock:
+                self._close()
+        else:
+            # Без паузы цикл камеры занял бы ядро целиком
+            self._stop_event.wait(1.0 / (self.fps or 30))
+        return False, None
+
+    def release(self):
+        self._stop_event.set()
+        with self._lock:
+            self._close()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import cv2
+import numpy as np
+
+from backends import create_backend
+
+
+# Порядок выходов модели эмоций DeepFace
+EMOTION_LABELS = ('angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral')
+
+# Названия эмоций в игре; отвращение в игровых режимах не используется
+EMOTION_NAMES = {
+    'angry': 'злость',
+    'fear': 'страх',
+    'happy': 'радость',
+    'sad': 'грусть',
+    'surprise': 'удивление',
+    'neutral': 'нейтральность'
+}
+
+INPUT_SIZE = 48
+
+# Коэффициенты BGR -> оттенки серого, как в cv2.COLOR_BGR2GRAY
+GRAY_WEIGHTS = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+
+def load_emotion_model():
+    """Keras-модель эмоций из DeepFace (веса скачиваются при первом запуске)"""
+    from deepface.modules import modeling
+    return modeling.build_model(task='facial_attribute', model_name='Emotion').model
+
+
+class EmotionClassifier:
+    """Пакетная классификация эмоций по вырезанным лицам в обход DeepFace.analyze
+
+    Модель держится в памяти, предобработка всего батча выполняется одним
+    векторным шагом, а предсказание - одним вызовом бэкенда (см. backends.py).
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else create_backend('keras')
+        self._resized = np.empty((0, INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8)
+        self._batch = np.empty((0, INPUT_SIZE, INPUT_SIZE, 1), dtype=np.float32)
+
+    def _reserve(self, count):
+        if len(self._batch) < count:
+            capacity = max(count, 2 * len(self._batch), 4)
+            self._resized = np.empty((capacity, INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8)
+            self._batch = np.empty((capacity, INPUT_SIZE, INPUT_SIZE, 1), dtype=np.float32)
+
+    def preprocess(self, faces):
+        """Лица BGR произвольного размера -> батч (N, 48, 48, 1) float32 в [0, 1]"""
+        count = len(faces)
+        self._reserve(count)
+
+        resized = self._resized[:count]
+        for i, face in enumerate(faces):
+            cv2.resize(face, (INPUT_SIZE, INPUT_SIZE), dst=resized[i],
+                       interpolation=cv2.INTER_AREA)
+
+        # Перевод в серый и нормализация всего батча одной операцией
+        batch = self._batch[:count]
+        np.dot(resized, GRAY_WEIGHTS / 255.0, out=batch[..., 0])
+        return batch
+
+    def predict(self, faces):
+        """Вероятности эмоций: массив (N, 7) в порядке EMOTION_LABELS"""
+        if not len(faces):
+            return np.zeros((0, len(EMOTION_LABELS)), dtype=np.float32)
+
+        return self.backend.predict(self.preprocess(faces))
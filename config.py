@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+import copy
+import json
+import os
+
+
+# Настройки по умолчанию; файл config.json переопределяет отдельные ключи
+DEFAULT_CONFIG = {
+    # Захват и анализ в разных потоках
+    'pipelined': True,
+    # Камера (см. capture.py): запрашиваемый формат и буфер драйвера;
+    # кадры, пролежавшие в буфере (grab быстрее drain_threshold секунд),
+    # пропускаются. После reconnect_after неудачных чтений подряд камера
+    # переоткрывается с паузой от backoff до max_backoff секунд
+    'camera': {
+        'width': 640,
+        'height': 480,
+        'fourcc': 'MJPG',
+        'fps': 30,
+        'buffer_size': 1,
+        'drain': True,
+        'drain_threshold': 0.002,
+        'max_drain': 5,
+        'reconnect_after': 5,
+        'backoff': 0.5,
+        'max_backoff': 5.0,
+    },
+    # Детектор лиц cv2.dnn: размер входа сети и порог уверенности
+    'detector': {
+        'input_size': [300, 300],
+        'confidence': 0.7,
+    },
+    # Бэкенд модели эмоций: keras, tflite или tflite-int8 (см. backends.py)
+    'classifier': {
+        'backend': 'keras',
+        'model_path': None,
+        'num_threads': None,
+    },
+    # Анализ в отдельном процессе (см. worker.py): кадры передаются через
+    # кольцо из slots ячеек размера max_frame (высота, ширина, каналы)
+    # в разделяемой памяти; процесс перезапускается, если упал или не
+    # ответил за timeout секунд
+    'isolation': {
+        'enabled': False,
+        'slots': 4,
+        'max_frame': [1080, 1920, 3],
+        'timeout': 10.0,
+        'max_backoff': 30.0,
+    },
+    # Детекция лица раз в N кадров, между ними - отслеживание
+    'tracking': {
+        'enabled': True,
+        'detect_interval': 10,
+        'min_confidence': 0.5,
+    },
+    # Пропуск анализа неизменных кадров (см. gating.py): изменение ищется
+    # на серой миниатюре size; без игры и без лица дольше idle_after секунд
+    # анализ выполняется раз в idle_interval, пока в кадре нет движения
+    'gating': {
+        'enabled': True,
+        'size': [64, 48],
+        'pixel_threshold': 12,
+        'changed_fraction': 0.005,
+        'refresh_interval': 0.5,
+        'idle_after': 5.0,
+        'idle_interval': 2.0,
+        'reuse_interval': 0.1,
+    },
+    # Подстройка под машину (см. adaptive.py): уровни качества от лучшего к
+    # самому дешевому - вход детектора, детекция раз в N кадров, предел
+    # частоты анализа. Цель - возраст результата target_age_ms при выводе
+    # target_fps; лицо на входе детектора не мельче min_face_px
+    'adaptive': {
+        'enabled': False,
+        'target_age_ms': 150,
+        'target_fps': 30,
+        'min_headroom': 0.1,
+        'min_face_px': 40,
+        'default_face_fraction': 0.15,
+        'interval': 1.0,
+        'hold': 3.0,
+        'input_sizes': [[300, 300], [256, 256], [224, 224], [192, 192], [160, 160]],
+        'detect_intervals': [5, 10, 15, 20, 30],
+        'max_fps': [30, 20, 15, 10, 6],
+    },
+    # Сглаживание вероятностей эмоций для игровых режимов:
+    # ema (полупериод half_life, с) или mean (окно window, с), затем
+    # гистерезис - порог принятия эмоции и порог, ниже которого она сбрасывается
+    'smoothing': {
+        'method': 'ema',
+        'half_life': 0.3,
+        'window': 0.5,
+        'enter_threshold': 0.5,
+        'exit_threshold': 0.35,
+    },
+    # Дуэль: оба игрока в кадре одновременно вместо очереди
+    'duel': {
+        'simultaneous': True,
+    },
+    # Квест: name - id квеста из файлов папки directory (None - папка quests
+    # рядом с программой). Картинки сцен уменьшаются до image_size заранее
+    # и хранятся в кэше на cache_size штук; в фоне готовятся сцены на
+    # prefetch_depth переходов вперед
+    'quest': {
+        'directory': None,
+        'name': 'neoflex_lab',
+        'image_size': [400, 300],
+        'cache_size': 16,
+        'prefetch_depth': 2,
+    },
+    # HTTP-сервис: одновременные запросы объединяются в батч,
+    # первый запрос ждет попутчиков не дольше max_wait_ms
+    'service': {
+        'max_batch': 8,
+        'max_wait_ms': 10,
+        'max_faces': 4,
+        'max_upload_mb': 8,
+        'timeout': 10.0,
+    },
+    # Трансляция размеченного видео по MJPEG/WebSocket (см. streaming.py)
+    'stream': {
+        'enabled': False,
+        'host': '0.0.0.0',
+        'port': 8081,
+        'quality': 80,
+        'max_fps': 30,
+        'max_width': None,
+    },
+    # Станция из нескольких камер с общей моделью (см. station.py)
+    'station': {
+        'sources': [0],
+        'max_batch': 4,
+        'max_faces': 2,
+        'max_fps': 10,
+    },
+    # Время этапов, частоты и пропуски кадров (см. metrics.py): HUD поверх
+    # видео по клавише hud_key, CSV с ротацией, страница /metrics на port
+    'metrics': {
+        'enabled': False,
+        'hud': True,
+        'hud_key': '<F3>',
+        'csv': None,
+        'csv_interval': 5.0,
+        'csv_max_bytes': 1024 * 1024,
+        'host': '127.0.0.1',
+        'port': None,
+    },
+    # Запись сессии в папку: кадры кусками по chunk_frames и результаты анализа
+    'recording': {
+        'path': None,
+        'chunk_frames': 64,
+    },
+    # Воспроизведение записи вместо камеры: speed None - без пауз,
+    # cache - результаты анализа по хэшу кадра сохраняются рядом с записью
+    'replay': {
+        'path': None,
+        'speed': None,
+        'loop': False,
+        'cache': True,
+    },
+    # Файл JSON Lines для времени запуска (первый кадр, первый анализ)
+    'startup': {
+        'log': None,
+    },
+}
+
+
+def _merge(base, override):
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+def load_config(path='config.json'):
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            _merge(config, json.load(f))
+    return config
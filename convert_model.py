@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""Экспорт модели эмоций в TFLite и проверка точности бэкендов
+
+    python convert_model.py convert [--calibration папка_с_лицами]
+    python convert_model.py compare [--faces папка_с_лицами] [--backend tflite-int8]
+
+Для квантования int8 нужен представительный набор лиц (--calibration).
+Сравнение выполняется на фиксированном наборе: первые --limit изображений
+папки --faces в алфавитном порядке. Без папки используется детерминированный
+синтетический набор - он проверяет только численную близость, а не точность
+на реальных лицах.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from backends import (FLOAT_TOLERANCE, INT8_MEAN_TOLERANCE, INT8_MIN_AGREEMENT,
+                      MODELS_DIR, TFLITE_FLOAT_PATH, TFLITE_INT8_PATH,
+                      KerasBackend, create_backend)
+from benchmarks.common import IMAGE_EXTENSIONS
+from classifier import EmotionClassifier, INPUT_SIZE
+
+
+def load_faces(folder, limit):
+    """Фиксированный набор лиц BGR: из папки или синтетический"""
+    if folder:
+        paths = sorted(p for p in glob.glob(os.path.join(folder, '*'))
+                       if p.lower().endswith(IMAGE_EXTENSIONS))
+        faces = [cv2.imread(p) for p in paths[:limit]]
+        faces = [f for f in faces if f is not None]
+        if not faces:
+            raise SystemExit(f"Нет изображений в папке: {folder}")
+        return faces
+
+    print("Внимание: папка с лицами не задана, используется синтетический набор")
+    rng = np.random.default_rng(0)
+    faces = rng.integers(0, 256, (limit, INPUT_SIZE * 2, INPUT_SIZE * 2, 3), dtype=np.uint8)
+    return [cv2.GaussianBlur(f, (9, 9), 0) for f in faces]
+
+
+def convert(args):
+    import tensorflow as tf
+
+    backend = KerasBackend()
+    model = backend.model
+    os.makedirs(MODELS_DIR, exist_ok=True)
+
+    # Экспорт через конкретную функцию с динамическим размером батча
+    signature = tf.TensorSpec([None, INPUT_SIZE, INPUT_SIZE, 1], tf.float32)
+    function = tf.function(lambda x: model(x, training=False))
+    concrete = function.get_concrete_function(signature)
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete], model)
+    with open(TFLITE_FLOAT_PATH, 'wb') as f:
+        f.write(converter.convert())
+    print(f"Сохранено: {TFLITE_FLOAT_PATH}")
+
+    preprocess = EmotionClassifier(backend).preprocess
+    calibration = load_faces(args.calibration, args.limit)
+
+    def representative_dataset():
+        for face in calibration:
+            yield [preprocess([face]).copy()]
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete], model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    with open(TFLITE_INT8_PATH, 'wb') as f:
+        f.write(converter.convert())
+    print(f"Сохранено: {TFLITE_INT8_PATH}")
+
+
+def compare(args):
+    faces = load_faces(args.faces, args.limit)
+    reference = EmotionClassifier(create_backend('keras'))
+    expected = reference.predict(faces)
+
+    failed = False
+    for name in args.backend:
+        classifier = EmotionClassifier(create_backend(name))
+        started = time.perf_counter()
+        actual = np.concatenate([classifier.predict([face]) for face in faces])
+        latency = (time.perf_counter() - started) * 1000.0 / len(faces)
+
+        diff = np.abs(actual - expected)
+        agreement = float((actual.argmax(axis=1) == expected.argmax(axis=1)).mean())
+        if name == 'tflite':
+            passed = diff.max() <= FLOAT_TOLERANCE
+        else:
+            passed = agreement >= INT8_MIN_AGREEMENT and diff.mean() <= INT8_MEAN_TOLERANCE
+        failed = failed or not passed
+
+        print(f"{name:<12} совпадение {agreement:6.1%}  макс. разница {diff.max():.5f}  "
+              f"средняя {diff.mean():.5f}  {latency:6.2f} мс/лицо  "
+              f"{'OK' if passed else 'ВНЕ ДОПУСКА'}")
+
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Экспорт и проверка модели эмоций")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = commands.add_parser('convert', help="экспорт в TFLite float32 и int8")
+    convert_parser.add_argument('--calibration', help="папка с лицами для квантования")
+    convert_parser.add_argument('--limit', type=int, default=200)
+
+    compare_parser = commands.add_parser('compare', help="сравнение с исходной моделью")
+    compare_parser.add_argument('--faces', help="папка с фиксированным набором лиц")
+    compare_parser.add_argument('--limit', type=int, default=200)
+    compare_parser.add_argument('--backend', nargs='+', default=['tflite', 'tflite-int8'])
+
+    args = parser.parse_args()
+    if args.command == 'convert':
+        convert(args)
+        return 0
+    return compare(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
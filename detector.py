@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import os
+
+import cv2
+import numpy as np
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, 'opencv_face_detector_uint8.pb')
+CONFIG_PATH = os.path.join(BASE_DIR, 'opencv_face_detector.pbtxt')
+
+# Средние значения BGR, на которых обучалась сеть res10 SSD
+MEAN_BGR = (104.0, 177.0, 123.0)
+
+EMPTY_BOXES = np.zeros((0, 4), dtype=np.int32)
+EMPTY_SCORES = np.zeros((0,), dtype=np.float32)
+
+
+class FaceDetector:
+    """Детектор лиц на cv2.dnn поверх поставляемой сети opencv_face_detector
+
+    Сеть загружается один раз. Координаты рамок возвращаются сразу в
+    пикселях исходного изображения: (x, y, w, h), по убыванию уверенности.
+    """
+
+    def __init__(self, input_size=(300, 300), confidence=0.7,
+                 model_path=MODEL_PATH, config_path=CONFIG_PATH):
+        self.input_size = tuple(input_size)
+        self.confidence = confidence
+        self.net = cv2.dnn.readNetFromTensorflow(model_path, config_path)
+        # Граф TF с этой сетью не всегда принимает батч > 1,
+        # тогда прогоняем изображения батча по одному
+        self._batch_supported = True
+
+    def detect(self, image):
+        """Лица на одном изображении BGR: (boxes int32 (K, 4), scores (K,))"""
+        return self.detect_batch([image])[0]
+
+    def detect_batch(self, images):
+        """Лица на нескольких изображениях (кадрах или вырезках) за один проход"""
+        if not images:
+            return []
+
+        sizes = np.array([image.shape[1::-1] for image in images], dtype=np.float32)
+        return self.infer(self.preprocess(images), sizes)
+
+    def preprocess(self, images):
+        """Масштабирование и вычитание среднего: батч для сети"""
+        return cv2.dnn.blobFromImages(images, 1.0, self.input_size, MEAN_BGR,
+                                      swapRB=False, crop=False)
+
+    def infer(self, blob, sizes):
+        """Прогон подготовленного батча; sizes - (ширина, высота) исходных изображений"""
+        return self._postprocess(self._forward(blob), sizes)
+
+    def _forward(self, blob):
+        if self._batch_supported or len(blob) == 1:
+            try:
+                self.net.setInput(blob)
+                return self.net.forward()[0, 0]
+            except cv2.error:
+                if len(blob) == 1:
+                    raise
+                self._batch_supported = False
+
+        outputs = []
+        for i in range(len(blob)):
+            self.net.setInput(blob[i:i + 1])
+            detections = self.net.forward()[0, 0].copy()
+            detections[:, 0] = i
+            outputs.append(detections)
+        return np.concatenate(outputs)
+
+    def _postprocess(self, detections, sizes):
+        # Строки detections: [image_id, label, confidence, x1, y1, x2, y2],
+        # координаты нормированы на размер исходного изображения
+        keep = detections[:, 2] >= self.confidence
+        detections = detections[keep]
+        image_ids = detections[:, 0].astype(np.int32)
+
+        corners = np.clip(detections[:, 3:7], 0.0, 1.0)
+        corners *= np.tile(sizes[image_ids], 2)
+        boxes = np.empty((len(corners), 4), dtype=np.int32)
+        boxes[:, 0:2] = corners[:, 0:2]
+        boxes[:, 2:4] = corners[:, 2:4] - corners[:, 0:2]
+        scores = detections[:, 2].astype(np.float32)
+
+        results = []
+        for i in range(len(sizes)):
+            mask = (image_ids == i) & (boxes[:, 2] > 0) & (boxes[:, 3] > 0)
+            if not mask.any():
+                results.append((EMPTY_BOXES, EMPTY_SCORES))
+                continue
+            order = np.argsort(-scores[mask])
+            results.append((boxes[mask][order], scores[mask][order]))
+        return results
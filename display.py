@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import queue
+import time
+import tkinter as tk
+
+from PIL import Image, ImageTk
+
+from framebuffer import FrameConverter
+from metrics import NULL_METRICS
+
+
+class FrameDisplay:
+    """Вывод кадров в Tk-метку через одно постоянное PhotoImage
+
+    Масштабирование и перевод BGR -> RGB выполняются в потоке камеры
+    в заранее выделенные буферы (FrameConverter), главный поток только
+    копирует пиксели в существующее изображение. Обновление запускается
+    приходом нового кадра, а не таймером.
+
+    Если при отправке указано время захвата кадра, на выводе измеряется
+    задержка от камеры до экрана (camera_to_display).
+    """
+
+    # Отступ от краев метки, чтобы изображение не раздувало ее размер
+    MARGIN = 4
+
+    def __init__(self, label, on_frame=None, buffers=3, metrics=NULL_METRICS):
+        self.label = label
+        self.on_frame = on_frame
+        self.metrics = metrics
+        self.frame_queue = queue.Queue(maxsize=1)
+        self.converter = FrameConverter(buffers)
+
+        self.photo = None
+        self.photo_size = None
+        self._pending = False
+
+        # Счетчики вывода
+        self.shown = 0
+        self.dropped = 0
+        self.fps = 0.0
+        self.latency_ms = 0.0
+        self._last_shown = None
+
+        label.bind('<Configure>', self._on_configure)
+        label.bind('<<NewFrame>>', self._show)
+
+    def _on_configure(self, event):
+        size = (event.width - self.MARGIN, event.height - self.MARGIN)
+        if size[0] > 0 and size[1] > 0:
+            self.converter.target_size = size
+
+    def submit(self, frame, timestamp=None):
+        """Подготовить кадр BGR к выводу (вызывается из потока камеры)"""
+        rgb = self.converter.convert(frame)
+        item = (rgb, timestamp)
+
+        with self.converter.lock:
+            try:
+                self.frame_queue.put_nowait(item)
+            except queue.Full:
+                self.frame_queue.get_nowait()
+                self.dropped += 1
+                self.metrics.count('display_dropped')
+                self.frame_queue.put_nowait(item)
+            self.converter.queued = rgb
+
+        # Одно событие на еще не показанный кадр
+        if not self._pending:
+            self._pending = True
+            try:
+                self.label.event_generate('<<NewFrame>>', when='tail')
+            except tk.TclError:
+                # Окно уже закрыто
+                pass
+
+    def _show(self, event=None):
+        self._pending = False
+        # Буфер помечается выводимым в том же захвате, что и вынимается из
+        # очереди, иначе поток камеры успел бы записать в него новый кадр
+        with self.converter.lock:
+            try:
+                rgb, timestamp = self.frame_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.converter.showing = rgb
+
+        started = self.metrics.start()
+        height, width = rgb.shape[:2]
+        image = Image.frombuffer('RGB', (width, height), rgb, 'raw', 'RGB', 0, 1)
+        if self.photo is None or self.photo_size != (width, height):
+            self.photo = ImageTk.PhotoImage(image=image)
+            self.photo_size = (width, height)
+            self.label.configure(image=self.photo)
+        else:
+            self.photo.paste(image)
+        with self.converter.lock:
+            self.converter.showing = None
+        self.metrics.observe('display_paint', started)
+
+        now = time.monotonic()
+        if timestamp is not None:
+            latency = (now - timestamp) * 1000.0
+            self.metrics.record('camera_to_display', latency)
+            self.latency_ms = latency if not self.latency_ms else 0.9 * self.latency_ms + 0.1 * latency
+        if self._last_shown is not None:
+            # Интервалы между кадрами на экране: их разброс виден как рывки
+            self.metrics.record('display_interval', (now - self._last_shown) * 1000.0)
+            # Сглаженная частота вывода
+            instant = 1.0 / max(now - self._last_shown, 1e-6)
+            self.fps = instant if not self.fps else 0.9 * self.fps + 0.1 * instant
+        self._last_shown = now
+        self.shown += 1
+
+        if self.on_frame:
+            self.on_frame()
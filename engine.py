@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+import numpy as np
+
+from backends import create_backend
+from classifier import EmotionClassifier, INPUT_SIZE
+from detector import FaceDetector
+
+
+class EmotionEngine:
+    """Общее ядро анализа: детектор лиц и классификатор эмоций
+
+    Модели загружаются и прогреваются методом load, обычно в фоновом потоке;
+    до этого ready не установлен и анализ выполнять нельзя.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.detector = None
+        self.classifier = None
+        self.ready = threading.Event()
+        self.error = None
+        # Длительность этапов загрузки, секунды
+        self.load_times = {}
+
+    def load(self, progress=None):
+        progress = progress or (lambda text, fraction: None)
+        try:
+            started = time.monotonic()
+            progress("Загрузка детектора лиц...", 0.1)
+            detector = self.config['detector']
+            self.detector = FaceDetector(input_size=detector['input_size'],
+                                         confidence=detector['confidence'])
+            self.load_times['detector'] = time.monotonic() - started
+
+            started = time.monotonic()
+            progress("Загрузка модели эмоций...", 0.3)
+            classifier = self.config['classifier']
+            backend = create_backend(classifier['backend'],
+                                     model_path=classifier['model_path'],
+                                     num_threads=classifier['num_threads'])
+            self.classifier = EmotionClassifier(backend)
+            self.load_times['classifier'] = time.monotonic() - started
+
+            started = time.monotonic()
+            progress("Прогрев моделей...", 0.8)
+            self.warmup()
+            self.load_times['warmup'] = time.monotonic() - started
+
+        except Exception as e:
+            self.error = e
+            raise
+
+        progress("Модели готовы", 1.0)
+        self.ready.set()
+
+    def warmup(self, runs=2):
+        # Пустые прогоны, чтобы первый настоящий кадр не платил
+        # за инициализацию графа и выделение памяти
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        face = np.zeros((INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8)
+        for _ in range(runs):
+            self.detector.detect(frame)
+            self.classifier.predict([face])
+
+    def set_detector_input(self, input_size):
+        if self.detector:
+            self.detector.input_size = tuple(input_size)
+
+    def detect(self, frame):
+        return self.detector.detect(frame)
+
+    def classify(self, faces):
+        return self.classifier.predict(faces)
+
+    def classify_regions(self, frame, boxes):
+        """Вероятности эмоций для всех рамок (x, y, w, h) кадра одним батчем"""
+        faces = [frame[y:y + h, x:x + w] for x, y, w, h in boxes]
+        return self.classifier.predict(faces)
+
+    def analyze_batch(self, frames, max_faces=None):
+        """Анализ нескольких кадров: детекция батчем, все лица - одним вызовом модели
+
+        Возвращает по кадру кортеж (boxes, scores, probabilities).
+        """
+        detections = self.detector.detect_batch(frames)
+        faces = []
+        counts = []
+        for frame, (boxes, scores) in zip(frames, detections):
+            boxes = boxes[:max_faces]
+            faces.extend(frame[y:y + h, x:x + w] for x, y, w, h in boxes)
+            counts.append(len(boxes))
+
+        probabilities = self.classifier.predict(faces)
+        results = []
+        offset = 0
+        for (boxes, scores), count in zip(detections, counts):
+            results.append((boxes[:count], scores[:count],
+                            probabilities[offset:offset + count]))
+            offset += count
+        return results
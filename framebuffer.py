@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import cv2
+import numpy as np
+
+
+class FrameConverter:
+    """Масштабирование кадра BGR под окно и перевод в RGB без выделения памяти
+
+    Результат пишется в кольцо заранее выделенных буферов, поэтому буфер,
+    который сейчас выводится или ждет вывода, не перезаписывается. Модуль не
+    зависит от Tk и используется также в бенчмарках без дисплея.
+    """
+
+    def __init__(self, buffers=3):
+        self.target_size = None
+        self._fit_cache = (None, None, None)
+
+        # Кольцо RGB-буферов: один выводится, один в очереди, в третий пишем
+        self._buffers = [None] * buffers
+        self._scaled = None
+        self._next = 0
+        # queued и showing меняются под lock вместе с очередью вывода:
+        # буфер, вынутый из очереди, сразу помечается выводимым
+        self.lock = threading.Lock()
+        self.queued = None
+        self.showing = None
+
+    def fit(self, frame_size):
+        # Размер вывода пересчитывается только при смене размера окна или кадра
+        target = self.target_size
+        cached_frame, cached_target, size = self._fit_cache
+        if cached_frame == frame_size and cached_target == target:
+            return size
+
+        if target is None:
+            size = frame_size
+        else:
+            scale = min(target[0] / frame_size[0], target[1] / frame_size[1])
+            size = (max(1, int(frame_size[0] * scale)), max(1, int(frame_size[1] * scale)))
+        self._fit_cache = (frame_size, target, size)
+        return size
+
+    def _free_buffer(self, shape):
+        with self.lock:
+            return self._pick_buffer(shape)
+
+    def _pick_buffer(self, shape):
+        for _ in range(len(self._buffers)):
+            i = self._next
+            self._next = (i + 1) % len(self._buffers)
+            buffer = self._buffers[i]
+            if buffer is None or buffer.shape != shape:
+                buffer = self._buffers[i] = np.empty(shape, dtype=np.uint8)
+            if buffer is not self.showing and buffer is not self.queued:
+                return buffer
+        raise RuntimeError("Нет свободного буфера вывода")
+
+    def convert(self, frame):
+        """Кадр BGR -> RGB-буфер размера вывода"""
+        frame_size = (frame.shape[1], frame.shape[0])
+        size = self.fit(frame_size)
+        rgb = self._free_buffer((size[1], size[0], 3))
+
+        if size != frame_size:
+            if self._scaled is None or self._scaled.shape != rgb.shape:
+                self._scaled = np.empty(rgb.shape, dtype=np.uint8)
+            cv2.resize(frame, size, dst=self._scaled, interpolation=cv2.INTER_AREA)
+            frame = self._scaled
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        return rgb
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+
+class GameCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    """Отмена одной игровой сессии
+
+    Ожидания через sleep и проверки check прерываются исключением
+    GameCancelled сразу после cancel.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        self._event.set()
+
+    def check(self):
+        if self._event.is_set():
+            raise GameCancelled()
+
+    def sleep(self, seconds):
+        if self._event.wait(seconds):
+            raise GameCancelled()
+
+
+class GameSession:
+    __slots__ = ('name', 'target', 'args', 'token', 'requested', 'started')
+
+    def __init__(self, name, target, args):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.token = CancelToken()
+        self.requested = time.monotonic()
+        self.started = None
+
+
+class GameScheduler:
+    """Один поток, в котором по очереди идут игровые сессии
+
+    start отменяет текущую сессию и ставит новую на ее место, не блокируя
+    вызывающий (главный) поток. Новая сессия запускается в том же потоке,
+    когда прежняя вышла по отмене, поэтому одновременно работает не больше
+    одной игры. Из нескольких быстрых нажатий выполнится последнее.
+
+    Задержка запуска - от вызова start до начала сессии, включая время на
+    завершение прежней.
+    """
+
+    def __init__(self, on_cancel=None, on_started=None):
+        # on_cancel будит ожидания сессии (например, ResultNotifier.wake),
+        # on_started(session, задержка в мс) - для метрик
+        self.on_cancel = on_cancel
+        self.on_started = on_started
+        self._cond = threading.Condition()
+        self._pending = None
+        self._current = None
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='game-sessions', daemon=True)
+        self._thread.start()
+
+        self.last_start_ms = None
+
+    @property
+    def current(self):
+        return self._current
+
+    @property
+    def active(self):
+        """Идет ли неотмененная сессия"""
+        session = self._current
+        return session is not None and not session.token.cancelled
+
+    def start(self, name, target, *args):
+        session = GameSession(name, target, args)
+        with self._cond:
+            self._cancel_locked()
+            self._pending = session
+            self._cond.notify_all()
+        return session
+
+    def cancel(self):
+        with self._cond:
+            self._cancel_locked()
+
+    def _cancel_locked(self):
+        if self._current:
+            self._current.token.cancel()
+        if self._pending:
+            self._pending.token.cancel()
+            self._pending = None
+        if self.on_cancel:
+            self.on_cancel()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cancel_locked()
+            self._cond.notify_all()
+        self._thread.join(1.0)
+
+    def check(self):
+        """Прервать текущую сессию, если она отменена (из потока сессий)"""
+        session = self._current
+        if session is not None:
+            session.token.check()
+
+    def sleep(self, seconds):
+        session = self._current
+        if session is None:
+            time.sleep(seconds)
+        else:
+            session.token.sleep(seconds)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                session, self._pending = self._pending, None
+                self._current = session
+
+            session.started = time.monotonic()
+            self.last_start_ms = (session.started - session.requested) * 1000.0
+            if self.on_started:
+                self.on_started(session, self.last_start_ms)
+            try:
+                session.target(*session.args)
+            except GameCancelled:
+                pass
+            except Exception as e:
+                print(f"Ошибка в игре {session.name}: {str(e)}")
+            finally:
+                with self._cond:
+                    self._current = None
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import time
+
+import cv2
+import numpy as np
+
+
+class FrameGate:
+    """Решает, нужен ли кадру анализ, или можно повторить прошлый результат
+
+    Кадр сравнивается с последним проанализированным по маленькой серой
+    миниатюре: изменением считается доля пикселей, сдвинувшихся по яркости
+    больше чем на pixel_threshold. Неизменный кадр пропускается, но не дольше
+    refresh_interval подряд.
+
+    Когда игра не идет и лица нет дольше idle_after секунд, включается режим
+    простоя: без изменений анализ выполняется раз в idle_interval, а первое
+    же движение в кадре возвращает полную частоту.
+    """
+
+    ACTIVE = 'active'
+    IDLE = 'idle'
+
+    def __init__(self, size=(64, 48), pixel_threshold=12, changed_fraction=0.005,
+                 refresh_interval=0.5, idle_after=5.0, idle_interval=2.0):
+        self.size = tuple(size)
+        self.pixel_threshold = pixel_threshold
+        self.changed_fraction = changed_fraction
+        self.refresh_interval = refresh_interval
+        self.idle_after = idle_after
+        self.idle_interval = idle_interval
+
+        self.state = self.ACTIVE
+        self._small = np.empty((self.size[1], self.size[0], 3), dtype=np.uint8)
+        self._thumb = np.empty((self.size[1], self.size[0]), dtype=np.uint8)
+        self._reference = np.empty_like(self._thumb)
+        self._diff = np.empty_like(self._thumb)
+        self._has_reference = False
+        self._last_analysis = None
+        self._last_presence = time.monotonic()
+
+        self.analyzed = 0
+        self.skipped = 0
+        self.wakeups = 0
+
+    @property
+    def skipped_fraction(self):
+        total = self.analyzed + self.skipped
+        return self.skipped / total if total else 0.0
+
+    def changed(self, frame):
+        """Отличается ли кадр от последнего проанализированного"""
+        cv2.resize(frame, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._thumb)
+        if not self._has_reference:
+            return True
+        cv2.absdiff(self._thumb, self._reference, dst=self._diff)
+        moved = np.count_nonzero(self._diff > self.pixel_threshold)
+        return moved > self.changed_fraction * self._diff.size
+
+    def update(self, frame, now, face_present, game_active):
+        """True, если кадр нужно анализировать"""
+        changed = self.changed(frame)
+
+        if face_present or game_active:
+            self._last_presence = now
+            self.state = self.ACTIVE
+        elif self.state == self.ACTIVE and now - self._last_presence > self.idle_after:
+            self.state = self.IDLE
+
+        if changed and self.state == self.IDLE:
+            # Движение будит мгновенно
+            self.state = self.ACTIVE
+            self._last_presence = now
+            self.wakeups += 1
+
+        interval = self.refresh_interval if self.state == self.ACTIVE else self.idle_interval
+        if not changed and self._last_analysis is not None and now - self._last_analysis < interval:
+            self.skipped += 1
+            return False
+
+        self._thumb, self._reference = self._reference, self._thumb
+        self._has_reference = True
+        self._last_analysis = now
+        self.analyzed += 1
+        return True
+
+
+class CpuMeter:
+    """Средняя загрузка CPU процессом, в процентах одного ядра"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._wall = time.monotonic()
+        self._cpu = time.process_time()
+
+    def percent(self):
+        wall = time.monotonic() - self._wall
+        return 100.0 * (time.process_time() - self._cpu) / wall if wall > 0 else 0.0
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Встроенный отчет о времени импорта модулей, аналог python -X importtime
+
+Подмена builtins.__import__ включается только флагом --import-report,
+без него модуль ничего не делает.
+
+Учитываются только импорты через оператор import: модули, загруженные
+через importlib.import_module (так DeepFace и TensorFlow подгружают
+часть своих модулей), в отчет не попадают, их время входит в время
+импортировавшего модуля. Полный отчет дает python -X importtime.
+"""
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+
+
+_original_import = builtins.__import__
+_local = threading.local()
+_lock = threading.Lock()
+# имя модуля -> [собственное время, суммарное время], секунды
+_timings = {}
+
+
+def _resolve(name, globals_, level):
+    if level == 0:
+        return name
+    package = (globals_ or {}).get('__package__') or ''
+    try:
+        return importlib.util.resolve_name('.' * level + name, package)
+    except (ImportError, ValueError):
+        return name
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    module_name = _resolve(name, globals, level)
+    if module_name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+
+    # Время вложенных импортов вычитается из собственного времени модуля
+    stack.append(0.0)
+    started = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - started
+        nested = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        with _lock:
+            entry = _timings.setdefault(module_name, [0.0, 0.0])
+            entry[0] += elapsed - nested
+            entry[1] += elapsed
+
+
+def enable():
+    builtins.__import__ = _timed_import
+
+
+def disable():
+    builtins.__import__ = _original_import
+
+
+def is_enabled():
+    return builtins.__import__ is _timed_import
+
+
+def report(limit=30, file=None):
+    """Самые дорогие импорты по суммарному времени"""
+    file = file or sys.stdout
+    with _lock:
+        rows = sorted(_timings.items(), key=lambda item: item[1][1], reverse=True)
+
+    print(f"{'собств., мс':>12} {'суммарно, мс':>13}  модуль", file=file)
+    for name, (self_time, total_time) in rows[:limit]:
+        print(f"{self_time * 1000:12.1f} {total_time * 1000:13.1f}  {name}", file=file)
+    print("Импорты через importlib.import_module не учтены отдельно; "
+          "полный отчет: python -X importtime app.py", file=file)
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""Счетчики и гистограммы времени этапов горячего пути
+
+Этапы отмечаются парой вызовов:
+
+    started = metrics.start()
+    ...
+    metrics.observe('overlay', started)
+
+Метрики включаются в настройках (metrics.enabled). Выключенные метрики -
+это NULL_METRICS, у которого все методы пустые, так что на кадр уходит
+лишь несколько пустых вызовов.
+
+Гистограммы накопительные; HUD, CSV и текстовая страница берут снимки и
+считают статистику за интервал по разнице двух снимков.
+"""
+import bisect
+import csv
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Верхние границы корзин гистограммы, мс: от 0.05 мс до 10 с, шаг ~1.3x
+BUCKETS = tuple(0.05 * 1.3 ** i for i in range(47))
+
+
+class Histogram:
+    """Гистограмма длительностей с логарифмическими корзинами"""
+    __slots__ = ('counts', 'total', 'count', '_lock')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(BUCKETS, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.total += value
+            self.count += 1
+
+    def copy(self):
+        with self._lock:
+            return list(self.counts), self.total, self.count
+
+
+def _percentile(counts, count, fraction):
+    # Верхняя граница корзины, в которую попадает нужная доля наблюдений
+    rank = fraction * count
+    seen = 0
+    for i, value in enumerate(counts):
+        seen += value
+        if seen >= rank and value:
+            return BUCKETS[min(i, len(BUCKETS) - 1)]
+    return BUCKETS[-1]
+
+
+class Metrics:
+    enabled = True
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def start(self):
+        return time.perf_counter()
+
+    def observe(self, name, started):
+        """Время этапа name от отметки start(), мс"""
+        self._histogram(name).observe((time.perf_counter() - started) * 1000.0)
+
+    def record(self, name, value):
+        """Готовое значение в мс (например, возраст результата анализа)"""
+        self._histogram(name).observe(value)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def snapshot(self):
+        with self._lock:
+            histograms = list(self.histograms.items())
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        return {
+            'time': time.monotonic(),
+            'histograms': {name: histogram.copy() for name, histogram in histograms},
+            'counters': counters,
+            'gauges': gauges,
+        }
+
+
+class NullMetrics:
+    """Выключенные метрики: все вызовы пустые"""
+    enabled = False
+
+    def start(self):
+        return 0.0
+
+    def observe(self, name, started):
+        pass
+
+    def record(self, name, value):
+        pass
+
+    def count(self, name, value=1):
+        pass
+
+    def gauge(self, name, value):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+def interval_stats(current, previous=None):
+    """Статистика между двумя снимками
+
+    Возвращает (stages, counters, gauges): для этапов - частота, среднее и
+    перцентили за интервал, для счетчиков - значение и прирост в секунду.
+    """
+    previous = previous or {'time': current['time'], 'histograms': {}, 'counters': {}}
+    elapsed = max(current['time'] - previous['time'], 1e-6)
+
+    stages = {}
+    for name, (counts, total, count) in sorted(current['histograms'].items()):
+        old_counts, old_total, old_count = previous['histograms'].get(
+            name, ([0] * len(counts), 0.0, 0))
+        count -= old_count
+        if not count:
+            continue
+        delta = [new - old for new, old in zip(counts, old_counts)]
+        stages[name] = {
+            'count': count,
+            'rate': count / elapsed,
+            'mean_ms': (total - old_total) / count,
+            'p50_ms': _percentile(delta, count, 0.5),
+            'p99_ms': _percentile(delta, count, 0.99),
+        }
+
+    counters = {name: (value, (value - previous['counters'].get(name, 0)) / elapsed)
+                for name, value in sorted(current['counters'].items())}
+    return stages, counters, dict(sorted(current['gauges'].items()))
+
+
+def hud_lines(stats):
+    """Короткие строки для вывода поверх видео"""
+    stages, counters, gauges = stats
+    lines = [f"{name}: {s['rate']:.0f}/с  {s['mean_ms']:.1f} мс  p99 {s['p99_ms']:.1f}"
+             for name, s in stages.items()]
+    lines += [f"{name}: {value} (+{rate:.1f}/с)" for name, (value, rate) in counters.items()]
+    lines += [f"{name}: {value:.0f}" for name, value in gauges.items()]
+    return lines
+
+
+def render_text(metrics):
+    """Накопительные метрики в текстовом формате Prometheus"""
+    snapshot = metrics.snapshot()
+    lines = []
+    for name, (counts, total, count) in sorted(snapshot['histograms'].items()):
+        metric = f"neoflex_{name}_ms"
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, value in zip(BUCKETS, counts):
+            cumulative += value
+            lines.append(f'{metric}_bucket{{le="{bound:.3f}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{le="+Inf"}} {count}')
+        lines.append(f"{metric}_sum {total:.3f}")
+        lines.append(f"{metric}_count {count}")
+    for name, value in sorted(snapshot['counters'].items()):
+        lines.append(f"# TYPE neoflex_{name}_total counter")
+        lines.append(f"neoflex_{name}_total {value}")
+    for name, value in sorted(snapshot['gauges'].items()):
+        lines.append(f"# TYPE neoflex_{name} gauge")
+        lines.append(f"neoflex_{name} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+class CsvExporter:
+    """Раз в interval секунд дописывает статистику за интервал в CSV
+
+    Когда файл превышает max_bytes, он переименовывается в .1 и начинается
+    новый, так что на диске не больше двух файлов.
+    """
+
+    FIELDS = ('time', 'name', 'kind', 'count', 'rate', 'mean_ms', 'p50_ms', 'p99_ms', 'value')
+
+    def __init__(self, metrics, path, interval=5.0, max_bytes=1024 * 1024):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='metrics-csv', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join(1.0)
+
+    def _rotate(self):
+        if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+            os.replace(self.path, self.path + '.1')
+
+    def _run(self):
+        previous = self.metrics.snapshot()
+        while not self._stop_event.wait(self.interval):
+            current = self.metrics.snapshot()
+            stages, counters, gauges = interval_stats(current, previous)
+            previous = current
+            now = time.strftime('%Y-%m-%dT%H:%M:%S')
+
+            rows = [{'time': now, 'name': name, 'kind': 'stage', **s}
+                    for name, s in stages.items()]
+            rows += [{'time': now, 'name': name, 'kind': 'counter', 'value': value, 'rate': rate}
+                     for name, (value, rate) in counters.items()]
+            rows += [{'time': now, 'name': name, 'kind': 'gauge', 'value': value}
+                     for name, value in gauges.items()]
+            try:
+                self._rotate()
+                new_file = not os.path.exists(self.path)
+                with open(self.path, 'a', newline='', encoding='utf-8') as f:
+                    writer = csv.DictWriter(f, self.FIELDS)
+                    if new_file:
+                        writer.writeheader()
+                    writer.writerows(rows)
+            except OSError as e:
+                print(f"Ошибка записи метрик: {str(e)}")
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_text(self.server.metrics).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer:
+    """Страница /metrics для сборщика метрик, в фоновом потоке"""
+
+    def __init__(self, metrics, host='127.0.0.1', port=9108):
+        self.httpd = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.metrics = metrics
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='metrics-http', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+
+FONT_CANDIDATES = ("arial.ttf", "DejaVuSans.ttf")
+
+
+def load_font(size, candidates=FONT_CANDIDATES):
+    # Шрифт ищется один раз; если ничего не нашлось - стандартный шрифт PIL
+    for name in candidates:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def hex_to_bgr(hex_color):
+    hex_color = hex_color.lstrip('#')
+    r, g, b = (int(hex_color[i:i + 2], 16) for i in (0, 2, 4))
+    return b, g, r
+
+
+class TextSprite:
+    """Заранее растеризованный текст: маска прозрачности и цвет"""
+    __slots__ = ('inverse_alpha', 'premultiplied', 'height', 'width')
+
+    def __init__(self, mask, color):
+        alpha = mask.astype(np.uint16)[..., None]
+        self.inverse_alpha = 255 - alpha
+        self.premultiplied = alpha * np.array(color, dtype=np.uint16)
+        self.height, self.width = mask.shape
+
+
+class OverlayRenderer:
+    """Отрисовка подписей и рамок прямо на кадре BGR без перехода в PIL
+
+    Шрифт и цвета палитры разрешаются один раз. Каждая надпись растеризуется
+    в спрайт при первом появлении и берется из LRU-кэша, пока текст не
+    изменится; на кадр спрайты накладываются альфа-смешиванием в numpy.
+    """
+
+    def __init__(self, palette, font_size=24, cache_size=128):
+        self.colors = {name: hex_to_bgr(value) for name, value in palette.items()}
+        self.font = load_font(font_size)
+        self.cache_size = cache_size
+        self._sprites = OrderedDict()
+        self._buffer = np.empty(0, dtype=np.uint16)
+
+    def sprite(self, text, color):
+        key = (text, color)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            return sprite
+
+        left, top, right, bottom = self.font.getbbox(text)
+        mask = Image.new('L', (max(1, right), max(1, bottom)), 0)
+        ImageDraw.Draw(mask).text((0, 0), text, font=self.font, fill=255)
+        sprite = TextSprite(np.asarray(mask), self.colors.get(color, color))
+
+        self._sprites[key] = sprite
+        if len(self._sprites) > self.cache_size:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def text(self, frame, position, text, color):
+        """Наложить надпись на кадр на месте; position - левый верхний угол"""
+        sprite = self.sprite(text, color)
+        x, y = position
+        frame_h, frame_w = frame.shape[:2]
+
+        # Обрезка спрайта по границам кадра
+        sx, sy = max(0, -x), max(0, -y)
+        x0, y0 = max(0, x), max(0, y)
+        x1 = min(frame_w, x + sprite.width)
+        y1 = min(frame_h, y + sprite.height)
+        if x1 <= x0 or y1 <= y0:
+            return
+
+        h, w = y1 - y0, x1 - x0
+        size = h * w * 3
+        if self._buffer.size < size:
+            self._buffer = np.empty(size, dtype=np.uint16)
+        blended = self._buffer[:size].reshape(h, w, 3)
+
+        roi = frame[y0:y1, x0:x1]
+        np.multiply(roi, sprite.inverse_alpha[sy:sy + h, sx:sx + w], out=blended)
+        blended += sprite.premultiplied[sy:sy + h, sx:sx + w]
+        blended //= 255
+        roi[...] = blended
+
+    def rectangle(self, frame, region, color, thickness=2):
+        x, y, w, h = region
+        cv2.rectangle(frame, (x, y), (x + w, y + h), self.colors.get(color, color), thickness)
+
+
+def render_game_overlay(renderer, frame, faces=(), region=None, target=None, current='',
+                        latency='', duel=None, hud=()):
+    """Кадр игры с подписями на копии frame
+
+    faces - игроки дуэли (FaceResult), иначе region - рамка лица;
+    duel - (подпись игрока, (счет 1, счет 2), раунд); hud - строки метрик.
+    """
+    # Рисуем на копии: исходный кадр может еще анализироваться
+    canvas = frame.copy()
+    height, width = frame.shape[:2]
+
+    if faces:
+        for face in faces:
+            x, y, w, h = face.region
+            renderer.rectangle(canvas, face.region, 'accent')
+            renderer.text(canvas, (x, max(0, y - 30)),
+                          f"Игрок {face.player + 1}: {face.emotion.upper()}", 'accent')
+    elif region:
+        renderer.rectangle(canvas, region, 'accent')
+
+    if target:
+        renderer.text(canvas, (20, height - 40), f"Цель: {target.upper()}", 'primary')
+    renderer.text(canvas, (20, 60), f"Текущая: {current.upper()}", 'secondary')
+    renderer.text(canvas, (20, 20), latency, 'text')
+
+    if duel:
+        player, scores, round_number = duel
+        renderer.text(canvas, (width - 200, 60), player, 'accent')
+        renderer.text(canvas, (width - 250, 100), f"Счет: {scores[0]} - {scores[1]}", 'secondary')
+        renderer.text(canvas, (width - 200, 140), f"Раунд {round_number}/3", 'primary')
+
+    for i, line in enumerate(hud):
+        renderer.text(canvas, (20, 100 + 22 * i), line, 'text')
+    return canvas
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+
+class FaceResult:
+    """Эмоция одного игрока в кадре"""
+    __slots__ = ('player', 'emotion', 'region', 'probabilities')
+
+    def __init__(self, player, emotion, region, probabilities):
+        self.player = player
+        self.emotion = emotion
+        self.region = region
+        self.probabilities = probabilities
+
+
+class AnalysisResult:
+    """Результат анализа одного кадра
+
+    emotion, region и probabilities относятся к основному лицу,
+    faces - ко всем игрокам в многопользовательском режиме.
+    stable_emotion и player_emotions - сглаженные метки для игровых режимов,
+    stable_label - номер сглаженной метки в EMOTION_LABELS.
+    """
+    __slots__ = ('frame_index', 'timestamp', 'emotion', 'region', 'probabilities',
+                 'faces', 'latency', 'stable_emotion', 'stable_label', 'player_emotions')
+
+    def __init__(self, emotion=None, region=None, probabilities=None, faces=(),
+                 frame_index=0, timestamp=0.0, latency=0.0):
+        self.emotion = emotion
+        self.region = region
+        self.probabilities = probabilities
+        self.faces = faces
+        self.frame_index = frame_index
+        # Монотонное время захвата кадра, по которому считался результат
+        self.timestamp = timestamp
+        self.latency = latency
+        self.stable_emotion = None
+        self.stable_label = None
+        self.player_emotions = {}
+
+    def age(self, frame_index, timestamp):
+        """Возраст результата относительно кадра: (кадров, миллисекунд)"""
+        return frame_index - self.frame_index, (timestamp - self.timestamp) * 1000.0
+
+
+class LatestFrameSlot:
+    """Слот на один кадр: новый кадр вытесняет ещё не обработанный старый"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, frame_index, timestamp, frame):
+        with self._cond:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = (frame_index, timestamp, frame)
+            self._cond.notify()
+
+    def take(self, timeout=None):
+        with self._cond:
+            if self._item is None and not self._closed:
+                self._cond.wait(timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class InferenceStage:
+    """Поток анализа, который всегда берет самый свежий кадр
+
+    Захват и отрисовка работают с частотой камеры, а результат анализа
+    публикуется по мере готовности. Необработанные кадры не копятся в очереди,
+    а отбрасываются.
+    """
+
+    def __init__(self, analyze_fn, on_result=None):
+        self.slot = LatestFrameSlot()
+        self._analyze = analyze_fn
+        self._on_result = on_result
+        self._latest = None
+        # Номер последнего отправленного кадра и последнего обработанного
+        self._submitted = 0
+        self._finished = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='inference', daemon=True)
+        self.analyzed = 0
+
+    @property
+    def latest(self):
+        return self._latest
+
+    @property
+    def busy(self):
+        """Последний отправленный кадр еще ждет анализа или анализируется"""
+        return self._finished != self._submitted
+
+    @property
+    def dropped(self):
+        return self.slot.dropped
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        self.slot.close()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def submit(self, frame_index, timestamp, frame):
+        self._submitted = frame_index
+        self.slot.put(frame_index, timestamp, frame)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            item = self.slot.take(timeout=0.1)
+            if item is None:
+                continue
+
+            frame_index, timestamp, frame = item
+            started = time.monotonic()
+            try:
+                result = self._analyze(frame)
+            except Exception as e:
+                # Сбой на одном кадре не должен останавливать поток анализа
+                print(f"Ошибка анализа: {str(e)}")
+                self._finished = frame_index
+                continue
+            result.frame_index = frame_index
+            result.timestamp = timestamp
+            result.latency = time.monotonic() - started
+
+            self._latest = result
+            self.analyzed += 1
+            if self._on_result:
+                self._on_result(result)
+            self._finished = frame_index
+
+
+class ResultNotifier:
+    """Ожидание результатов анализа вместо опроса в цикле
+
+    Потоки ждут новый результат на условной переменной через wait.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._sequence = 0
+        self._latest = None
+
+    @property
+    def sequence(self):
+        return self._sequence
+
+    @property
+    def latest(self):
+        return self._latest
+
+    def publish(self, result):
+        with self._cond:
+            self._sequence += 1
+            self._latest = result
+            self._cond.notify_all()
+
+    def wait(self, sequence, timeout=None):
+        """Ждать результат новее sequence
+
+        Возвращает (номер, результат), по таймауту или wake - (sequence, None).
+        """
+        with self._cond:
+            if self._sequence == sequence:
+                self._cond.wait(timeout)
+            if self._sequence == sequence:
+                return sequence, None
+            return self._sequence, self._latest
+
+    def wake(self):
+        """Разбудить всех ожидающих, например при остановке игры"""
+        with self._cond:
+            self._cond.notify_all()
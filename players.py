@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import numpy as np
+
+
+class PlayerAssigner:
+    """Устойчивые номера игроков для лиц в кадре
+
+    Лица сопоставляются с игроками прошлого кадра по ближайшему центру.
+    Новые лица занимают свободные номера слева направо, поэтому при старте
+    дуэли левый игрок - первый, правый - второй.
+
+    assign вызывается из потока анализа, reset - из потока игры, поэтому
+    оба идут под блокировкой.
+    """
+
+    def __init__(self, max_players=2, max_distance=0.25, forget_after=15):
+        self.max_players = max_players
+        # Максимальный сдвиг центра между кадрами, доля ширины кадра
+        self.max_distance = max_distance
+        self.forget_after = forget_after
+        self._centers = {}
+        self._missed = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._centers.clear()
+            self._missed.clear()
+
+    def assign(self, boxes, frame_width):
+        """Номера игроков для рамок (x, y, w, h); -1 для лишних лиц"""
+        with self._lock:
+            return self._assign(boxes, frame_width)
+
+    def _assign(self, boxes, frame_width):
+        players = np.full(len(boxes), -1, dtype=np.int32)
+        if len(boxes):
+            centers = boxes[:, 0:2] + boxes[:, 2:4] / 2.0
+            self._match_known(centers, players, frame_width)
+            self._assign_new(centers, players)
+            for i, player in enumerate(players):
+                if player >= 0:
+                    self._centers[player] = centers[i]
+                    self._missed[player] = 0
+
+        # Давно пропавшие игроки освобождают номер
+        seen = set(players[players >= 0].tolist())
+        for player in list(self._centers):
+            if player not in seen:
+                self._missed[player] += 1
+                if self._missed[player] > self.forget_after:
+                    del self._centers[player]
+                    del self._missed[player]
+        return players
+
+    def _match_known(self, centers, players, frame_width):
+        if not self._centers:
+            return
+        known = list(self._centers)
+        known_centers = np.array([self._centers[p] for p in known])
+        distances = np.linalg.norm(known_centers[:, None, :] - centers[None, :, :], axis=2)
+        limit = self.max_distance * frame_width
+
+        # Жадное сопоставление по возрастанию расстояния
+        used_players = set()
+        for flat in np.argsort(distances, axis=None):
+            k, i = np.unravel_index(flat, distances.shape)
+            if distances[k, i] > limit:
+                break
+            if known[k] in used_players or players[i] >= 0:
+                continue
+            players[i] = known[k]
+            used_players.add(known[k])
+
+    def _assign_new(self, centers, players):
+        free = [p for p in range(self.max_players) if p not in self._centers]
+        for i in np.argsort(centers[:, 0]):
+            if not free:
+                break
+            if players[i] < 0:
+                players[i] = free.pop(0)
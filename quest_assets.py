@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import queue
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+
+class SceneImageCache:
+    """Декодированные и уже уменьшенные до size картинки квеста (LRU)
+
+    Картинки загружаются в фоновом потоке по prefetch, главный поток
+    получает готовое изображение PIL через get. Промах загружает картинку
+    сразу; файл, который не открылся, запоминается как None, чтобы не
+    читать диск на каждом переходе.
+    """
+
+    def __init__(self, size=(400, 300), capacity=16):
+        self.size = tuple(size)
+        self.capacity = capacity
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._thread = threading.Thread(target=self._run, name='quest-assets', daemon=True)
+        self._thread.start()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, path):
+        try:
+            with Image.open(path) as image:
+                return image.convert('RGB').resize(self.size, Image.Resampling.LANCZOS)
+        except Exception as e:
+            print(f"Ошибка загрузки изображения: {str(e)}")
+            return None
+
+    def _store(self, path, image):
+        with self._lock:
+            self._images[path] = image
+            self._images.move_to_end(path)
+            while len(self._images) > self.capacity:
+                self._images.popitem(last=False)
+
+    def get(self, path):
+        with self._lock:
+            if path in self._images:
+                self._images.move_to_end(path)
+                self.hits += 1
+                return self._images[path]
+            self.misses += 1
+        image = self._load(path)
+        self._store(path, image)
+        return image
+
+    def prefetch(self, paths):
+        with self._lock:
+            # Уже загруженные поднимаются в LRU, чтобы не вытеснить нужное
+            for path in paths:
+                if path in self._images:
+                    self._images.move_to_end(path)
+                elif path not in self._pending:
+                    self._pending.add(path)
+                    self._queue.put(path)
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            if path is None:
+                break
+            with self._lock:
+                cached = path in self._images
+            if not cached:
+                self._store(path, self._load(path))
+            with self._lock:
+                self._pending.discard(path)
+
+    def stop(self):
+        self._queue.put(None)
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""Квесты из файлов данных
+
+Квест - JSON-файл в папке quests, id квеста - имя файла:
+
+    {
+      "title": "...",
+      "assets_dir": "..",
+      "start": 0,
+      "scenes": {
+        "0": {"text": "...", "image": "lab_door.jpg",
+              "emotions": {"радость": 2, "злость": 1}},
+        "2": {"text": "...", "image": "success.jpg", "emotions": {}, "final": true}
+      }
+    }
+
+При загрузке квест компилируется: сцены нумеруются подряд, эмоции
+заменяются номерами меток классификатора, переходы собираются в плотную
+таблицу (сцена x метка), заранее считаются достижимость, тупики и списки
+картинок для предзагрузки. Переход по эмоции в игре - одно обращение к
+таблице по номерам.
+"""
+import json
+import os
+
+import numpy as np
+
+
+QUESTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'quests')
+
+NO_SCENE = -1
+
+# Текст сцены, добавленной вместо отсутствующей в файле
+UNFINISHED_TEXT = "Продолжение этой ветки квеста еще не написано"
+
+
+class QuestError(ValueError):
+    pass
+
+
+def label_ids(labels, translations):
+    """Номера меток по английским и переведенным названиям эмоций"""
+    ids = {label: i for i, label in enumerate(labels)}
+    ids.update({translations[label]: i for i, label in enumerate(labels) if label in translations})
+    return ids
+
+
+class QuestGraph:
+    """Скомпилированный квест; сцены адресуются номерами 0..len-1
+
+    transitions[scene][label] - сцена после эмоции label или NO_SCENE.
+    """
+
+    def __init__(self, quest_id, title, stages, texts, images, final, transitions, start,
+                 missing=(), prefetch_depth=2):
+        self.id = quest_id
+        self.title = title
+        # Номера сцен из файла, для сообщений
+        self.stages = stages
+        self.texts = texts
+        self.images = images
+        self.final = final
+        self.transitions = transitions
+        self.start = start
+        self.missing = missing
+
+        # Сцены-соседи для каждой сцены
+        self.targets = tuple(tuple(sorted({target for target in row if target != NO_SCENE}))
+                             for row in transitions)
+        # Сцена без выходов завершает квест: финал или тупик
+        self.terminal = tuple(not targets for targets in self.targets)
+        self.dead_ends = tuple(i for i, targets in enumerate(self.targets)
+                               if not targets and not final[i])
+
+        size = len(stages)
+        adjacency = np.zeros((size, size), dtype=bool)
+        for scene, targets in enumerate(self.targets):
+            adjacency[scene, list(targets)] = True
+        self.reachable = self._closure(adjacency)
+        self.unreachable = tuple(np.flatnonzero(~self.reachable[start]).tolist())
+        self.assets = self._assets(adjacency, prefetch_depth)
+
+    def __len__(self):
+        return len(self.stages)
+
+    @staticmethod
+    def _closure(adjacency):
+        # Транзитивное замыкание возведением в квадрат: log2(n) умножений
+        # (float32 - через BLAS, значения - число путей, точность не важна)
+        reachable = adjacency | np.eye(len(adjacency), dtype=bool)
+        while True:
+            matrix = reachable.astype(np.float32)
+            square = matrix @ matrix > 0
+            if (square == reachable).all():
+                return reachable
+            reachable = square
+
+    def _assets(self, adjacency, depth):
+        # Картинки сцен не дальше depth переходов, ближние первыми, и
+        # стартовой: после проигрыша квест начинается сначала
+        size = len(adjacency)
+        distances = np.where(np.eye(size, dtype=bool), 0, depth + 1)
+        frontier = np.eye(size, dtype=np.float32)
+        steps = adjacency.astype(np.float32)
+        for step in range(1, depth + 1):
+            reached = (frontier @ steps > 0) & (distances > depth)
+            distances[reached] = step
+            frontier = reached.astype(np.float32)
+        order = np.argsort(distances, axis=1, kind='stable').tolist()
+        counts = (distances <= depth).sum(axis=1).tolist()
+
+        images, start = self.images, self.start
+        return tuple(tuple(dict.fromkeys(images[i] for i in row[:count] + [start] if images[i]))
+                     for row, count in zip(order, counts))
+
+    def next_scene(self, scene, label):
+        """Сцена после эмоции с номером label или NO_SCENE"""
+        return self.transitions[scene][label]
+
+    def problems(self):
+        """Описание ошибок в квесте; пустой список - квест цел"""
+        problems = [f"переход {self.stages[scene]} -> {target} ({emotion}): нет такой сцены"
+                    for scene, emotion, target in self.missing]
+        # Добавленные вместо отсутствующих сцены уже описаны выше
+        added = {target for scene, emotion, target in self.missing}
+        problems += [f"тупик: сцена {self.stages[i]} без выходов и не финальная"
+                     for i in self.dead_ends if self.stages[i] not in added]
+        problems += [f"сцена {self.stages[i]} недостижима из стартовой"
+                     for i in self.unreachable]
+        if not any(self.final[i] for i in np.flatnonzero(self.reachable[self.start])):
+            problems.append("из стартовой сцены не достижим ни один финал")
+        return problems
+
+
+def compile_quest(data, labels, num_labels, assets_dir='', prefetch_depth=2):
+    """Квест из словаря JSON; labels - номер метки по названию эмоции
+
+    Переход в сцену, которой нет в файле, ведет в добавленную сцену-тупик
+    с текстом UNFINISHED_TEXT: игра покажет, что ветка не дописана.
+    """
+    try:
+        # Ключи вида "01" допустимы: сцены берутся по исходным ключам
+        scenes = sorted((int(key), scene) for key, scene in data['scenes'].items())
+        stages = [stage for stage, scene in scenes]
+        index = {stage: i for i, stage in enumerate(stages)}
+        if len(index) < len(stages):
+            raise ValueError("номера сцен повторяются")
+        start = index[int(data.get('start', stages[0] if stages else 0))]
+    except (KeyError, ValueError, TypeError, AttributeError) as e:
+        raise QuestError(f"Неверная структура квеста: {str(e)}")
+
+    assets_dir = os.path.join(assets_dir, data.get('assets_dir', ''))
+    transitions = [[NO_SCENE] * num_labels for _ in stages]
+    texts, images, final, missing = [], [], [], []
+    for i, (stage, scene) in enumerate(scenes):
+        texts.append(scene.get('text', ''))
+        image = scene.get('image')
+        images.append(os.path.normpath(os.path.join(assets_dir, image)) if image else None)
+        final.append(bool(scene.get('final', False)))
+        for emotion, target in scene.get('emotions', {}).items():
+            if emotion not in labels:
+                raise QuestError(f"Сцена {stage}: неизвестная эмоция '{emotion}'")
+            try:
+                target = int(target)
+            except (ValueError, TypeError):
+                raise QuestError(f"Сцена {stage}: неверный номер сцены '{target}' ({emotion})")
+            if target not in index:
+                missing.append((i, emotion, target))
+                # Сцена-тупик без выходов вместо несуществующей, после всех сцен файла
+                index[target] = len(stages)
+                stages.append(target)
+                transitions.append([NO_SCENE] * num_labels)
+            transitions[i][labels[emotion]] = index[target]
+
+    added = len(stages) - len(scenes)
+    texts += [UNFINISHED_TEXT] * added
+    images += [None] * added
+    final += [False] * added
+
+    return QuestGraph(data.get('id'), data.get('title', ''), tuple(stages), tuple(texts),
+                      tuple(images), tuple(final), tuple(tuple(row) for row in transitions),
+                      start, tuple(missing), prefetch_depth)
+
+
+class QuestLibrary:
+    """Квесты папки по id (имени файла без .json)
+
+    При запуске только перечисляются файлы; квест читается и компилируется
+    при первом обращении и дальше берется готовым, так что сотни файлов
+    в папке не задерживают старт.
+    """
+
+    def __init__(self, directory, labels, num_labels, prefetch_depth=2):
+        self.directory = directory
+        self.labels = labels
+        self.num_labels = num_labels
+        self.prefetch_depth = prefetch_depth
+        self._quests = {}
+        try:
+            names = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+        except OSError as e:
+            print(f"Ошибка чтения папки квестов: {str(e)}")
+            names = []
+        self.ids = tuple(os.path.splitext(name)[0] for name in names)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, quest_id):
+        return quest_id in self.ids
+
+    def load(self, quest_id):
+        """Скомпилировать квест; QuestError, если файл с ошибкой"""
+        quest = self._quests.get(quest_id)
+        if quest is None:
+            path = os.path.join(self.directory, quest_id + '.json')
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                raise QuestError(f"Не удалось прочитать {path}: {str(e)}")
+            data['id'] = quest_id
+            quest = self._quests[quest_id] = compile_quest(
+                data, self.labels, self.num_labels, self.directory, self.prefetch_depth)
+        return quest
+
+    def get(self, quest_id):
+        try:
+            return self.load(quest_id)
+        except QuestError as e:
+            print(f"Ошибка загрузки квеста {quest_id}: {str(e)}")
+            return None
+
+    def check(self):
+        """Проблемы всех квестов папки: {id: [описание, ...]}"""
+        report = {}
+        for quest_id in self.ids:
+            try:
+                report[quest_id] = self.load(quest_id).problems()
+            except QuestError as e:
+                report[quest_id] = [str(e)]
+        return report
+
+
+if __name__ == '__main__':
+    import sys
+
+    from classifier import EMOTION_LABELS, EMOTION_NAMES
+
+    # Проверка квестов: python quest_graph.py [папка]
+    library = QuestLibrary(sys.argv[1] if len(sys.argv) > 1 else QUESTS_DIR,
+                           label_ids(EMOTION_LABELS, EMOTION_NAMES), len(EMOTION_LABELS))
+    failed = False
+    for quest_id, problems in library.check().items():
+        print(f"{quest_id}: {'ошибок нет' if not problems else f'{len(problems)} проблем(ы)'}")
+        for problem in problems:
+            print(f"  {problem}")
+        failed = failed or bool(problems)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""Запись игровых сессий и воспроизведение вместо камеры
+
+Сессия - это папка:
+
+    meta.json         - размер кадра, число кадров в куске, отпечаток настроек
+    index.bin         - по записи на кадр: номер, время захвата, кусок, ячейка, хэш
+    frames_00000.npy  - куски по chunk_frames кадров, формат .npy (memmap)
+    results.jsonl     - результаты анализа с номером кадра
+
+Кадры пишутся в отображенные в память куски и читаются так же, поэтому
+запись любой длины воспроизводится без загрузки в память целиком.
+
+InferenceCache хранит результаты анализа по хэшу содержимого кадра:
+повторное воспроизведение той же записи с теми же настройками анализа
+не запускает модели заново.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from pipeline import AnalysisResult, FaceResult
+
+
+INDEX_DTYPE = np.dtype([('frame_index', '<i8'), ('timestamp', '<f8'),
+                        ('chunk', '<i4'), ('slot', '<i4'), ('digest', 'S16')])
+
+
+def frame_digest(frame):
+    """Хэш содержимого кадра (16 байт)"""
+    return hashlib.blake2b(np.ascontiguousarray(frame).data, digest_size=16).digest()
+
+
+def analysis_fingerprint(config):
+    """Отпечаток настроек, от которых зависит результат анализа кадра
+
+    Пропуск кадров и адаптация входа детектора при записи тоже меняют
+    результаты, поэтому их настройки входят в отпечаток.
+    """
+    key = {name: config[name] for name in ('detector', 'classifier', 'tracking',
+                                           'gating', 'adaptive')}
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def cache_key(digest, multi_face):
+    # Один и тот же кадр в режиме одного лица и в дуэли анализируется по-разному
+    return digest + (b'\x01' if multi_face else b'\x00')
+
+
+def result_to_dict(result):
+    def array(values):
+        return None if values is None else [round(float(v), 6) for v in values]
+
+    return {
+        'frame_index': result.frame_index,
+        'timestamp': result.timestamp,
+        'latency': result.latency,
+        'emotion': result.emotion,
+        'region': result.region and list(result.region),
+        'probabilities': array(result.probabilities),
+        'faces': [{'player': face.player, 'emotion': face.emotion, 'region': list(face.region),
+                   'probabilities': array(face.probabilities)} for face in result.faces],
+    }
+
+
+def result_from_dict(data):
+    def array(values):
+        return None if values is None else np.array(values, dtype=np.float32)
+
+    faces = tuple(FaceResult(face['player'], face['emotion'], tuple(face['region']),
+                             array(face['probabilities'])) for face in data['faces'])
+    region = data['region'] and tuple(data['region'])
+    return AnalysisResult(data['emotion'], region, array(data['probabilities']), faces,
+                          data['frame_index'], data['timestamp'], data['latency'])
+
+
+def _chunk_path(path, chunk):
+    return os.path.join(path, f'frames_{chunk:05d}.npy')
+
+
+class SessionRecorder:
+    """Запись кадров и результатов анализа в папку сессии
+
+    write вызывается из потока камеры, write_result - из потока анализа.
+    """
+
+    def __init__(self, path, chunk_frames=64, fingerprint=None):
+        self.path = path
+        self.chunk_frames = chunk_frames
+        self.fingerprint = fingerprint
+        os.makedirs(path, exist_ok=True)
+
+        self.meta = None
+        self.frames = 0
+        self._chunk = None
+        self._index = open(os.path.join(path, 'index.bin'), 'wb')
+        self._results = open(os.path.join(path, 'results.jsonl'), 'w', encoding='utf-8')
+        self._results_lock = threading.Lock()
+        self._record = np.zeros(1, dtype=INDEX_DTYPE)
+
+    def _write_meta(self, frame):
+        self.meta = {
+            'shape': list(frame.shape),
+            'chunk_frames': self.chunk_frames,
+            'fingerprint': self.fingerprint,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        with open(os.path.join(self.path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+
+    def write(self, frame_index, timestamp, frame):
+        if self.meta is None:
+            self._write_meta(frame)
+        elif list(frame.shape) != self.meta['shape']:
+            # Кадр другого размера (камера переключила режим) не записывается
+            return
+
+        chunk, slot = divmod(self.frames, self.chunk_frames)
+        if slot == 0:
+            if self._chunk is not None:
+                self._chunk.flush()
+            self._chunk = np.lib.format.open_memmap(
+                _chunk_path(self.path, chunk), mode='w+', dtype=np.uint8,
+                shape=(self.chunk_frames,) + frame.shape)
+        self._chunk[slot] = frame
+
+        record = self._record[0]
+        record['frame_index'] = frame_index
+        record['timestamp'] = timestamp
+        record['chunk'] = chunk
+        record['slot'] = slot
+        record['digest'] = frame_digest(frame)
+        self._index.write(self._record.tobytes())
+        self.frames += 1
+
+    def write_result(self, result, multi_face=False):
+        data = result_to_dict(result)
+        data['multi_face'] = multi_face
+        line = json.dumps(data, ensure_ascii=False)
+        with self._results_lock:
+            if not self._results.closed:
+                self._results.write(line + '\n')
+
+    def close(self):
+        if self._chunk is not None:
+            self._chunk.flush()
+            self._chunk = None
+        self._index.close()
+        with self._results_lock:
+            self._results.close()
+
+
+class SessionReplay:
+    """Источник кадров из записанной сессии вместо cv2.VideoCapture
+
+    speed=None - без пауз, быстрее реального времени; 1.0 - в темпе записи.
+    Время захвата кадра (timestamp) переносится на текущие монотонные часы
+    с сохранением интервалов записи, деленных на speed.
+    """
+
+    def __init__(self, path, speed=None, loop=False):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.index = np.fromfile(os.path.join(path, 'index.bin'), dtype=INDEX_DTYPE)
+        self._chunks = {}
+        self._position = 0
+        self._started = None
+
+        self.timestamp = None
+        self.digest = None
+        self.frame_index = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def isOpened(self):
+        return len(self.index) > 0
+
+    def _chunk(self, chunk):
+        # Открытыми держатся только текущий и предыдущий куски
+        data = self._chunks.get(chunk)
+        if data is None:
+            data = np.load(_chunk_path(self.path, chunk), mmap_mode='r')
+            self._chunks = {c: d for c, d in self._chunks.items() if c >= chunk - 1}
+            self._chunks[chunk] = data
+        return data
+
+    def read(self):
+        if self._position >= len(self.index):
+            if not self.loop or not len(self.index):
+                return False, None
+            self._position = 0
+            self._started = None
+
+        record = self.index[self._position]
+        self._position += 1
+
+        first = self.index[0]['timestamp']
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now
+        offset = float(record['timestamp'] - first) / (self.speed or 1.0)
+        if self.speed:
+            delay = self._started + offset - now
+            if delay > 0:
+                time.sleep(delay)
+
+        self.timestamp = self._started + offset
+        self.digest = bytes(record['digest'])
+        self.frame_index = int(record['frame_index'])
+        frame = np.array(self._chunk(int(record['chunk']))[int(record['slot'])])
+        return True, frame
+
+    def release(self):
+        self._chunks = {}
+
+    def recorded_results(self):
+        """Записанные результаты анализа по ключу кэша (хэш кадра и режим)"""
+        digests = {int(record['frame_index']): bytes(record['digest']) for record in self.index}
+        results = {}
+        path = os.path.join(self.path, 'results.jsonl')
+        if not os.path.exists(path):
+            return results
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    # Оборванная последняя строка
+                    continue
+                digest = digests.get(data['frame_index'])
+                if digest is not None:
+                    results[cache_key(digest, data.get('multi_face', False))] = data
+        return results
+
+
+class InferenceCache:
+    """Результаты анализа по ключу cache_key, с дозаписью в файл
+
+    Файл свой для каждого отпечатка настроек анализа, так что смена
+    модели или порогов детектора не подмешивает старые результаты.
+    """
+
+    def __init__(self, directory, fingerprint):
+        self.path = os.path.join(directory, f'cache-{fingerprint}.jsonl')
+        self._results = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        key, data = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._results[bytes.fromhex(key)] = data
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def __len__(self):
+        return len(self._results)
+
+    def seed(self, results):
+        """Добавить результаты, например записанные вместе с сессией"""
+        for key, data in results.items():
+            if key not in self._results:
+                self.put_dict(key, data)
+
+    def get(self, key):
+        data = self._results.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result_from_dict(data)
+
+    def put(self, key, result):
+        self.put_dict(key, result_to_dict(result))
+
+    def put_dict(self, key, data):
+        line = json.dumps([key.hex(), data], ensure_ascii=False)
+        with self._lock:
+            self._results[key] = data
+            if not self._file.closed:
+                self._file.write(line + '\n')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
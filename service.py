@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Headless-сервис распознавания эмоций по HTTP
+
+Локально:
+    python service.py --port 8000
+Через gunicorn (модель загружается один раз в каждом воркере, потоки
+воркера делят один MicroBatcher):
+    gunicorn -w 2 --threads 8 -b 0.0.0.0:8000 'service:create_app()'
+
+POST /analyze - тело запроса JPEG/PNG (или поле формы frame),
+ответ - JSON с областями лиц и вероятностями эмоций.
+"""
+import argparse
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import cv2
+import numpy as np
+from flask import Flask, jsonify, request
+from flask_cors import CORS
+
+from batching import MicroBatcher
+from classifier import EMOTION_LABELS
+from config import load_config
+from engine import EmotionEngine
+
+
+def decode_image(data):
+    if not data:
+        raise ValueError("Пустое тело запроса")
+    try:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    except cv2.error:
+        image = None
+    if image is None:
+        raise ValueError("Не удалось декодировать изображение")
+    return image
+
+
+def faces_to_json(boxes, scores, probabilities):
+    faces = []
+    for box, score, probs in zip(boxes, scores, probabilities):
+        x, y, w, h = (int(v) for v in box)
+        faces.append({
+            'region': {'x': x, 'y': y, 'w': w, 'h': h},
+            'confidence': float(score),
+            'emotion': {label: float(p) for label, p in zip(EMOTION_LABELS, probs)},
+            'dominant_emotion': EMOTION_LABELS[int(np.argmax(probs))],
+        })
+    return faces
+
+
+def create_app(config=None):
+    config = config or load_config()
+    service = config['service']
+
+    # То же ядро анализа, что и в process_frame настольного приложения
+    engine = EmotionEngine(config)
+    engine.load()
+    batcher = MicroBatcher(
+        lambda frames: engine.analyze_batch(frames, max_faces=service['max_faces']),
+        max_batch=service['max_batch'],
+        max_wait=service['max_wait_ms'] / 1000.0)
+
+    app = Flask(__name__)
+    CORS(app)
+    app.config['MAX_CONTENT_LENGTH'] = service['max_upload_mb'] * 1024 * 1024
+
+    @app.errorhandler(413)
+    def too_large(e):
+        # Тот же формат ошибки JSON, что и у /analyze, вместо HTML-страницы Flask
+        return jsonify({'error': f"Файл больше {service['max_upload_mb']} МБ"}), 413
+
+    @app.get('/health')
+    def health():
+        return jsonify({'status': 'ok', 'batches': batcher.batches, 'frames': batcher.items})
+
+    @app.post('/analyze')
+    def analyze():
+        upload = request.files.get('frame')
+        data = upload.read() if upload else request.get_data()
+        try:
+            image = decode_image(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        try:
+            boxes, scores, probabilities = batcher(image, timeout=service['timeout'])
+        except FutureTimeoutError:
+            return jsonify({'error': "Анализ не уложился в отведенное время"}), 503
+        except Exception as e:
+            print(f"Ошибка анализа: {str(e)}")
+            return jsonify({'error': "Ошибка анализа"}), 500
+        return jsonify({
+            'width': image.shape[1],
+            'height': image.shape[0],
+            'faces': faces_to_json(boxes, scores, probabilities),
+        })
+
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="NeoFlex Emotion AI: HTTP-сервис")
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    create_app(load_config(args.config)).run(host=args.host, port=args.port, threaded=True)
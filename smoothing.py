@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+
+class EmotionBuffer:
+    """Кольцевой буфер векторов вероятностей эмоций с отметками времени
+
+    Память выделяется один раз. Писатель один (поток анализа), читателей
+    может быть несколько: запросы считаются прямо по представлениям буфера
+    без копирования и повторяются, если писатель успел перезаписать
+    прочитанные ячейки.
+    """
+
+    def __init__(self, capacity=64, num_classes=7):
+        self.capacity = capacity
+        self._probabilities = np.zeros((capacity, num_classes), dtype=np.float32)
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        # Всего записано векторов; индекс публикуется после записи данных
+        self._written = 0
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    def clear(self):
+        self._written = 0
+
+    def push(self, timestamp, probabilities):
+        slot = self._written % self.capacity
+        self._probabilities[slot] = probabilities
+        self._timestamps[slot] = timestamp
+        self._written += 1
+
+    def latest(self):
+        """Последний вектор (копия) и его время; (None, None) для пустого буфера"""
+        written = self._written
+        if not written:
+            return None, None
+        slot = (written - 1) % self.capacity
+        return self._probabilities[slot].copy(), self._timestamps[slot]
+
+    def _query(self, count, compute):
+        # Читаем последние count записей; если за время расчета писатель
+        # дошел до этих ячеек по кругу, расчет повторяется
+        while True:
+            written = self._written
+            count = min(count, written, self.capacity)
+            if not count:
+                return None
+
+            end = written % self.capacity or self.capacity
+            start = end - count
+            if start >= 0:
+                result = compute(self._probabilities[start:end], self._timestamps[start:end])
+            else:
+                # Окно пересекает границу кольца: две части без копирования
+                result = compute((self._probabilities[start:], self._probabilities[:end]),
+                                 (self._timestamps[start:], self._timestamps[:end]))
+
+            if self._written - written <= self.capacity - count:
+                return result
+
+    def _count_since(self, duration):
+        latest_probs, latest_time = self.latest()
+        if latest_time is None:
+            return 0
+        times = self._timestamps[:len(self)]
+        return int(np.count_nonzero(times >= latest_time - duration))
+
+    def window_mean(self, duration):
+        """Среднее вероятностей за последние duration секунд"""
+        def compute(probabilities, timestamps):
+            if isinstance(probabilities, tuple):
+                total = probabilities[0].sum(axis=0) + probabilities[1].sum(axis=0)
+                return total / (len(probabilities[0]) + len(probabilities[1]))
+            return probabilities.mean(axis=0)
+
+        return self._query(self._count_since(duration), compute)
+
+    def ema(self, half_life, duration=None):
+        """Экспоненциальное сглаживание с учетом времени кадров
+
+        Вес записи убывает вдвое каждые half_life секунд от последнего кадра,
+        поэтому неравномерная частота анализа не искажает результат.
+        """
+        duration = duration if duration is not None else 4.0 * half_life
+        decay = np.log(2.0) / half_life
+
+        def compute(probabilities, timestamps):
+            if isinstance(probabilities, tuple):
+                probabilities = np.concatenate(probabilities)
+                timestamps = np.concatenate(timestamps)
+            weights = np.exp(-decay * (timestamps.max() - timestamps))
+            return weights @ probabilities / weights.sum()
+
+        return self._query(self._count_since(duration), compute)
+
+
+class Hysteresis:
+    """Устойчивая метка эмоции с раздельными порогами входа и выхода
+
+    Новая эмоция принимается, когда ее сглаженная вероятность не ниже
+    enter_threshold, а текущая держится, пока не упадет ниже exit_threshold.
+    """
+
+    def __init__(self, enter_threshold=0.5, exit_threshold=0.35):
+        self.enter_threshold = enter_threshold
+        self.exit_threshold = exit_threshold
+        self.label = None
+
+    def reset(self):
+        self.label = None
+
+    def update(self, probabilities):
+        if probabilities is None:
+            self.label = None
+            return None
+
+        if self.label is not None and probabilities[self.label] >= self.exit_threshold:
+            return self.label
+
+        best = int(np.argmax(probabilities))
+        self.label = best if probabilities[best] >= self.enter_threshold else None
+        return self.label
+
+
+class EmotionSmoother:
+    """Буфер и гистерезис для одного лица: сырые кадры -> устойчивая метка"""
+
+    def __init__(self, method='ema', half_life=0.3, window=0.5,
+                 enter_threshold=0.5, exit_threshold=0.35, capacity=64, num_classes=7):
+        self.method = method
+        self.half_life = half_life
+        self.window = window
+        self.buffer = EmotionBuffer(capacity, num_classes)
+        self.hysteresis = Hysteresis(enter_threshold, exit_threshold)
+        self._empty = np.zeros(num_classes, dtype=np.float32)
+
+    def reset(self):
+        self.buffer.clear()
+        self.hysteresis.reset()
+
+    def smoothed(self):
+        if self.method == 'mean':
+            return self.buffer.window_mean(self.window)
+        return self.buffer.ema(self.half_life)
+
+    def push(self, timestamp, probabilities):
+        """Добавить кадр (None - лица нет) и вернуть индекс устойчивой эмоции"""
+        self.buffer.push(timestamp, self._empty if probabilities is None else probabilities)
+        return self.hysteresis.update(self.smoothed())
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""Несколько камер в одном процессе с общей моделью
+
+    python station.py --sources 0 1 2 3
+
+Каждая камера получает свое окно и свое состояние игры, а детектор и
+классификатор загружаются один раз. InferenceScheduler по очереди берет
+свежие кадры камер, объединяет их в один батч и соблюдает ограничение
+частоты анализа для каждого потока.
+"""
+import argparse
+import copy
+import os
+import threading
+import time
+
+from pipeline import LatestFrameSlot
+
+
+class StreamHandle:
+    """Поток одной камеры в планировщике
+
+    Повторяет интерфейс InferenceStage, поэтому NeoFlexEmotionGame
+    работает с ним так же, как с собственным потоком анализа.
+    """
+
+    def __init__(self, scheduler, name, build_result, on_result=None, max_fps=None):
+        self.scheduler = scheduler
+        self.name = name
+        self.slot = LatestFrameSlot()
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.next_due = 0.0
+        self._build_result = build_result
+        self._on_result = on_result
+        self._latest = None
+        self._submitted = 0
+        self.finished = 0
+        self.analyzed = 0
+        self.registered = time.monotonic()
+
+    @property
+    def latest(self):
+        return self._latest
+
+    @property
+    def busy(self):
+        """Последний отправленный кадр еще ждет анализа или анализируется"""
+        return self.finished != self._submitted
+
+    @property
+    def dropped(self):
+        return self.slot.dropped
+
+    @property
+    def fps(self):
+        return self.analyzed / max(time.monotonic() - self.registered, 1e-6)
+
+    def start(self):
+        pass
+
+    def stop(self, timeout=None):
+        self.scheduler.unregister(self)
+
+    def submit(self, frame_index, timestamp, frame):
+        self._submitted = frame_index
+        self.slot.put(frame_index, timestamp, frame)
+        self.scheduler.notify()
+
+    def deliver(self, item, boxes, scores, probabilities, latency):
+        frame_index, timestamp, frame = item
+        result = self._build_result(frame, boxes, probabilities)
+        result.frame_index = frame_index
+        result.timestamp = timestamp
+        result.latency = latency
+
+        self._latest = result
+        self.analyzed += 1
+        if self._on_result:
+            self._on_result(result)
+        self.finished = frame_index
+
+
+class InferenceScheduler:
+    """Справедливое распределение общей модели между камерами
+
+    Потоки обходятся по кругу, начиная каждый раз со следующего, так что ни
+    одна камера не может занять модель целиком. В батч попадают только потоки
+    со свежим кадром, у которых истек интервал max_fps.
+    """
+
+    def __init__(self, engine, max_batch=4, max_faces=2):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_faces = max_faces
+        self._streams = []
+        self._cursor = 0
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='station-inference', daemon=True)
+
+        self.batches = 0
+        self.frames = 0
+
+    def register(self, name, build_result, on_result=None, max_fps=None):
+        handle = StreamHandle(self, name, build_result, on_result, max_fps)
+        with self._cond:
+            self._streams.append(handle)
+        return handle
+
+    def unregister(self, handle):
+        with self._cond:
+            if handle in self._streams:
+                self._streams.remove(handle)
+
+    def notify(self):
+        with self._cond:
+            self._cond.notify()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self.notify()
+        self._thread.join(1.0)
+
+    def _pick(self, now):
+        """Свежие кадры потоков, которым пора на анализ; и время до ближайшего"""
+        picked = []
+        wait = None
+        count = len(self._streams)
+        for k in range(count):
+            handle = self._streams[(self._cursor + k) % count]
+            if now < handle.next_due:
+                delay = handle.next_due - now
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            item = handle.slot.take(timeout=0)
+            if item is not None:
+                picked.append((handle, item))
+                if len(picked) >= self.max_batch:
+                    break
+        if count:
+            self._cursor = (self._cursor + 1) % count
+        return picked, wait
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if not self.engine.ready.wait(0.1):
+                continue
+
+            with self._cond:
+                picked, wait = self._pick(time.monotonic())
+                if not picked:
+                    self._cond.wait(wait if wait is not None else 0.5)
+                    continue
+
+            started = time.monotonic()
+            frames = [item[2] for handle, item in picked]
+            try:
+                results = self.engine.analyze_batch(frames, max_faces=self.max_faces)
+            except Exception as e:
+                print(f"Ошибка анализа: {str(e)}")
+                for handle, item in picked:
+                    handle.finished = item[0]
+                continue
+            latency = time.monotonic() - started
+
+            self.batches += 1
+            self.frames += len(frames)
+            for (handle, item), (boxes, scores, probabilities) in zip(picked, results):
+                handle.next_due = started + handle.min_interval
+                handle.deliver(item, boxes, scores, probabilities, latency)
+
+
+def main():
+    import tkinter as tk
+
+    from app import NeoFlexEmotionGame
+    from config import load_config
+    from engine import EmotionEngine
+
+    parser = argparse.ArgumentParser(description="NeoFlex Emotion AI: несколько камер")
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--sources', nargs='+',
+                        help="индексы камер или адреса видеопотоков")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    station = config['station']
+    sources = args.sources or station['sources']
+    sources = [int(s) if str(s).isdigit() else s for s in sources]
+
+    # Одна модель на все камеры, загружается в фоне
+    engine = EmotionEngine(config)
+    threading.Thread(target=engine.load, daemon=True).start()
+    scheduler = InferenceScheduler(engine, max_batch=station['max_batch'],
+                                   max_faces=station['max_faces'])
+    scheduler.start()
+
+    root = tk.Tk()
+    games = []
+
+    stopped = threading.Event()
+
+    def stop_all():
+        if stopped.is_set():
+            return
+        stopped.set()
+        # Сначала дочерние окна, главное окно закрывается последним
+        for game in reversed(games):
+            game.stop()
+        scheduler.stop()
+
+    for i, source in enumerate(sources):
+        window = root if i == 0 else tk.Toplevel(root)
+        booth_config = copy.deepcopy(config)
+        # У каждой кабины своя трансляция, страница метрик и папка записи
+        booth_config['stream']['port'] += i
+        metrics = booth_config['metrics']
+        if metrics['port']:
+            metrics['port'] += i
+        if metrics['csv']:
+            base, ext = os.path.splitext(metrics['csv'])
+            metrics['csv'] = f"{base}_{i + 1}{ext}"
+        recording = booth_config['recording']
+        if recording['path']:
+            recording['path'] = os.path.join(recording['path'], f"booth_{i + 1}")
+        game = NeoFlexEmotionGame(window, booth_config, engine=engine,
+                                  scheduler=scheduler, source=source, on_exit=stop_all)
+        window.title(f"NeoFlex Emotion AI - кабина {i + 1}")
+        games.append(game)
+
+    for game in games:
+        game.root.protocol("WM_DELETE_WINDOW", stop_all)
+    root.mainloop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""Трансляция размеченного видео зрителям по MJPEG и WebSocket
+
+Кадр кодируется в JPEG один раз в отдельном потоке и раздается всем
+зрителям. Медленный зритель получает самый свежий кадр, когда освободится,
+а промежуточные пропускает; поток камеры при этом только кладет кадр в слот.
+
+    /            - страница просмотра
+    /stream.mjpg - MJPEG-поток
+    /ws          - WebSocket, бинарные сообщения с JPEG
+    /stats       - статистика трафика и частоты кадров в JSON
+"""
+import base64
+import hashlib
+import json
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+from pipeline import LatestFrameSlot
+
+
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC11B85'
+BOUNDARY = 'neoflexframe'
+
+VIEWER_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>NeoFlex Emotion AI</title></head>
+<body style="margin:0;background:#00305E">
+<img id="video" style="width:100%;height:100vh;object-fit:contain">
+<script>
+var img = document.getElementById('video');
+var ws = new WebSocket('ws://' + location.host + '/ws');
+ws.binaryType = 'blob';
+ws.onmessage = function (event) {
+    var url = URL.createObjectURL(event.data);
+    img.onload = function () { URL.revokeObjectURL(url); };
+    img.src = url;
+};
+ws.onerror = function () { img.src = '/stream.mjpg'; };
+</script>
+</body></html>
+"""
+
+
+class ClientStats:
+    __slots__ = ('kind', 'address', 'connected', 'frames', 'bytes', 'skipped')
+
+    def __init__(self, kind, address):
+        self.kind = kind
+        self.address = address
+        self.connected = time.monotonic()
+        self.frames = 0
+        self.bytes = 0
+        self.skipped = 0
+
+    def as_dict(self):
+        elapsed = max(time.monotonic() - self.connected, 1e-6)
+        return {
+            'kind': self.kind,
+            'address': self.address,
+            'fps': self.frames / elapsed,
+            'kbps': self.bytes * 8 / 1000.0 / elapsed,
+            'frames': self.frames,
+            'skipped': self.skipped,
+        }
+
+
+class FrameBroadcaster:
+    """Кодирование кадра в JPEG один раз и раздача всем зрителям"""
+
+    def __init__(self, quality=80, max_fps=30, max_width=None):
+        self.quality = quality
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.max_width = max_width
+
+        self._slot = LatestFrameSlot()
+        self._cond = threading.Condition()
+        self._jpeg = None
+        self._sequence = 0
+        self._clients = []
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._encode_loop, name='stream-encoder', daemon=True)
+
+        self.encoded = 0
+        self.encoded_bytes = 0
+        self.started = time.monotonic()
+
+    @property
+    def stopped(self):
+        return self._stop_event.is_set()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._slot.close()
+        with self._cond:
+            self._cond.notify_all()
+
+    def publish(self, frame):
+        """Отдать кадр BGR на трансляцию (вызывается из потока камеры)"""
+        # Без зрителей кадр даже не кодируется
+        if self._clients:
+            self._slot.put(0, time.monotonic(), frame)
+
+    def _encode_loop(self):
+        last = 0.0
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        while not self._stop_event.is_set():
+            item = self._slot.take(timeout=0.5)
+            if item is None:
+                continue
+
+            wait = self.min_interval - (time.monotonic() - last)
+            if wait > 0:
+                time.sleep(wait)
+                # За время паузы мог прийти более свежий кадр
+                item = self._slot.take(timeout=0) or item
+            last = time.monotonic()
+
+            frame = item[2]
+            if self.max_width and frame.shape[1] > self.max_width:
+                scale = self.max_width / frame.shape[1]
+                frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            ok, encoded = cv2.imencode('.jpg', frame, params)
+            if not ok:
+                continue
+
+            jpeg = encoded.tobytes()
+            with self._cond:
+                self._jpeg = jpeg
+                self._sequence += 1
+                self._cond.notify_all()
+            self.encoded += 1
+            self.encoded_bytes += len(jpeg)
+
+    def next_frame(self, sequence, timeout=1.0):
+        """Самый свежий JPEG новее sequence: (номер, байты) или (sequence, None)"""
+        with self._cond:
+            if self._sequence == sequence and not self._stop_event.is_set():
+                self._cond.wait(timeout)
+            if self._sequence == sequence:
+                return sequence, None
+            return self._sequence, self._jpeg
+
+    def add_client(self, stats):
+        with self._cond:
+            self._clients.append(stats)
+
+    def remove_client(self, stats):
+        with self._cond:
+            if stats in self._clients:
+                self._clients.remove(stats)
+
+    def stats(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        with self._cond:
+            clients = [client.as_dict() for client in self._clients]
+        return {
+            'encoded_fps': self.encoded / elapsed,
+            'encoded_kbps': self.encoded_bytes * 8 / 1000.0 / elapsed,
+            'clients': clients,
+            'total_fps': sum(c['fps'] for c in clients),
+            'total_kbps': sum(c['kbps'] for c in clients),
+        }
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def broadcaster(self):
+        return self.server.broadcaster
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/':
+            self._send_body(VIEWER_PAGE.encode('utf-8'), 'text/html; charset=utf-8')
+        elif path == '/stats':
+            self._send_body(json.dumps(self.broadcaster.stats()).encode('utf-8'),
+                            'application/json')
+        elif path == '/stream.mjpg':
+            self._stream('mjpeg', self._send_mjpeg_frame, self._start_mjpeg)
+        elif path == '/ws' and self.headers.get('Upgrade', '').lower() == 'websocket':
+            self._stream('websocket', self._send_websocket_frame, self._start_websocket)
+        else:
+            self.send_error(404)
+
+    def _send_body(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_mjpeg(self):
+        self.send_response(200)
+        self.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+
+    def _send_mjpeg_frame(self, jpeg):
+        header = (f'--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n'
+                  f'Content-Length: {len(jpeg)}\r\n\r\n').encode('ascii')
+        self.wfile.write(header)
+        self.wfile.write(jpeg)
+        self.wfile.write(b'\r\n')
+        return len(header) + len(jpeg) + 2
+
+    def _start_websocket(self):
+        key = self.headers.get('Sec-WebSocket-Key', '')
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest())
+        self.send_response(101)
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept.decode('ascii'))
+        self.end_headers()
+
+    def _send_websocket_frame(self, jpeg):
+        # Бинарное сообщение без маски (сервер -> клиент)
+        length = len(jpeg)
+        if length < 126:
+            header = struct.pack('!BB', 0x82, length)
+        elif length < 65536:
+            header = struct.pack('!BBH', 0x82, 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x82, 127, length)
+        self.wfile.write(header)
+        self.wfile.write(jpeg)
+        return len(header) + length
+
+    def _stream(self, kind, send_frame, start):
+        start()
+        stats = ClientStats(kind, self.client_address[0])
+        broadcaster = self.broadcaster
+        broadcaster.add_client(stats)
+        sequence = 0
+        try:
+            while not broadcaster.stopped:
+                latest, jpeg = broadcaster.next_frame(sequence)
+                if jpeg is None:
+                    continue
+                # Кадры, закодированные пока клиент отправлял предыдущий, пропущены
+                if sequence:
+                    stats.skipped += latest - sequence - 1
+                sequence = latest
+                stats.bytes += send_frame(jpeg)
+                stats.frames += 1
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            pass
+        finally:
+            broadcaster.remove_client(stats)
+            self.close_connection = True
+
+
+class StreamServer:
+    """HTTP-сервер трансляции в фоновом потоке"""
+
+    def __init__(self, host='0.0.0.0', port=8081, quality=80, max_fps=30, max_width=None):
+        self.broadcaster = FrameBroadcaster(quality=quality, max_fps=max_fps, max_width=max_width)
+        self.httpd = ThreadingHTTPServer((host, port), StreamHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.broadcaster = self.broadcaster
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='stream-http', daemon=True)
+
+    def start(self):
+        self.broadcaster.start()
+        self._thread.start()
+
+    def publish(self, frame):
+        self.broadcaster.publish(frame)
+
+    def stop(self):
+        self.broadcaster.stop()
+        self.httpd.shutdown()
+        self.httpd.server_close()
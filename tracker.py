@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import cv2
+import numpy as np
+
+
+class FaceTracker:
+    """Отслеживание области лица оптическим потоком между детекциями
+
+    Полная детекция нужна раз в detect_interval кадров или когда доля
+    надежно отслеженных точек падает ниже min_confidence.
+    """
+
+    def __init__(self, detect_interval=10, min_confidence=0.5, max_points=40):
+        self.detect_interval = detect_interval
+        self.min_confidence = min_confidence
+        self.max_points = max_points
+
+        self.region = None
+        self.confidence = 0.0
+        self._prev_gray = None
+        self._points = None
+        self._initial_points = 0
+        self._frames_since_detection = 0
+
+        self._lk_params = dict(
+            winSize=(15, 15),
+            maxLevel=2,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
+        )
+
+    def needs_detection(self):
+        return (self.region is None
+                or self._frames_since_detection >= self.detect_interval
+                or self.confidence < self.min_confidence)
+
+    def reset(self, gray, region):
+        """Начать отслеживание с области, найденной детектором"""
+        self.region = None
+        self.confidence = 0.0
+        self._frames_since_detection = 0
+        self._prev_gray = gray
+
+        x, y, w, h = region
+        mask = np.zeros_like(gray)
+        mask[y:y + h, x:x + w] = 255
+        points = cv2.goodFeaturesToTrack(gray, self.max_points, 0.01, 5, mask=mask)
+        if points is None or len(points) < 4:
+            self._points = None
+            return
+
+        self._points = points
+        self._initial_points = len(points)
+        self.region = tuple(region)
+        self.confidence = 1.0
+
+    def clear(self):
+        self.region = None
+        self.confidence = 0.0
+        self._points = None
+
+    def update(self, gray):
+        """Перенести область на новый кадр; None, если след потерян"""
+        if self._points is None or self.region is None:
+            return None
+
+        self._frames_since_detection += 1
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(
+            self._prev_gray, gray, self._points, None, **self._lk_params)
+        back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(
+            gray, self._prev_gray, new_points, None, **self._lk_params)
+
+        # Прямо-обратная проверка отсекает точки, уехавшие на фон
+        fb_error = np.linalg.norm((self._points - back_points).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < 1.0)
+
+        self.confidence = good.sum() / self._initial_points
+        if good.sum() < 4 or self.confidence < self.min_confidence:
+            self.clear()
+            return None
+
+        old = self._points.reshape(-1, 2)[good]
+        new = new_points.reshape(-1, 2)[good]
+
+        # Сдвиг и масштаб по медианам, устойчиво к выбросам
+        dx, dy = np.median(new - old, axis=0)
+        old_dist = np.linalg.norm(old - old.mean(axis=0), axis=1)
+        new_dist = np.linalg.norm(new - new.mean(axis=0), axis=1)
+        valid = old_dist > 1e-3
+        scale = float(np.median(new_dist[valid] / old_dist[valid])) if valid.any() else 1.0
+
+        x, y, w, h = self.region
+        cx = x + w / 2.0 + dx
+        cy = y + h / 2.0 + dy
+        w, h = w * scale, h * scale
+
+        frame_h, frame_w = gray.shape[:2]
+        x = int(round(max(0, min(cx - w / 2.0, frame_w - 1))))
+        y = int(round(max(0, min(cy - h / 2.0, frame_h - 1))))
+        w = int(round(min(w, frame_w - x)))
+        h = int(round(min(h, frame_h - y)))
+        if w < 8 or h < 8:
+            self.clear()
+            return None
+
+        self.region = (x, y, w, h)
+        self._points = new.reshape(-1, 1, 2)
+        self._prev_gray = gray
+        return self.region
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""Анализ кадров в отдельном процессе
+
+RemoteEngine повторяет интерфейс EmotionEngine, но детектор и классификатор
+работают в дочернем процессе, который не делит GIL с окном Tk и игровыми
+потоками. Кадры передаются через заранее выделенное кольцо ячеек в
+multiprocessing.shared_memory, по каналу идут только номера ячеек и
+размеры, а обратно - рамки и вероятности.
+
+Процесс под присмотром: если он упал или не ответил за timeout секунд, он
+перезапускается с нарастающей паузой, а до готовности нового процесса
+ready сброшен и анализ не выполняется.
+"""
+import multiprocessing
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+# Дочерний процесс запускается заново, а не через fork: у родителя уже
+# работают потоки Tk, камеры и анализа
+CONTEXT = multiprocessing.get_context('spawn')
+
+
+class WorkerError(RuntimeError):
+    pass
+
+
+class FrameRing:
+    """Кольцо ячеек для кадров uint8 в разделяемой памяти"""
+
+    def __init__(self, slots, max_frame, name=None):
+        self.slots = slots
+        self.max_frame = tuple(max_frame)
+        self.slot_bytes = int(np.prod(self.max_frame))
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * self.slot_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self._next = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def view(self, slot, shape):
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf,
+                          offset=slot * self.slot_bytes)
+
+    def write(self, frame):
+        """Скопировать кадр в следующую ячейку: (ячейка, форма)"""
+        if frame.nbytes > self.slot_bytes:
+            raise WorkerError(f"Кадр {frame.shape} больше ячейки {self.max_frame}")
+        slot = self._next
+        self._next = (slot + 1) % self.slots
+        self.view(slot, frame.shape)[...] = frame
+        return slot, frame.shape
+
+    def close(self):
+        # Повторный вызов (после ошибки загрузки и в stop) ничего не делает
+        if self.shm is None:
+            return
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
+
+
+def _worker_main(conn, ring_name, slots, max_frame, config):
+    """Точка входа дочернего процесса"""
+    from engine import EmotionEngine
+
+    ring = FrameRing(slots, max_frame, name=ring_name)
+    engine = EmotionEngine(config)
+    try:
+        engine.load()
+    except Exception as e:
+        conn.send(('error', str(e)))
+        return
+    conn.send(('ready', engine.load_times))
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        command, args = message
+        if command == 'stop':
+            break
+        try:
+            if command == 'detect':
+                slot, shape = args
+                reply = engine.detect(ring.view(slot, shape))
+            elif command == 'classify':
+                slot, shape, boxes = args
+                reply = engine.classify_regions(ring.view(slot, shape), boxes)
+            elif command == 'analyze':
+                frames, max_faces = args
+                reply = engine.analyze_batch([ring.view(slot, shape) for slot, shape in frames],
+                                             max_faces=max_faces)
+            elif command == 'input_size':
+                reply = engine.set_detector_input(args)
+            else:
+                raise WorkerError(f"Неизвестная команда: {command}")
+            conn.send(('ok', reply))
+        except Exception as e:
+            conn.send(('error', str(e)))
+    ring.close()
+
+
+class RemoteEngine:
+    """EmotionEngine в отдельном процессе под присмотром"""
+
+    def __init__(self, config):
+        self.config = config
+        isolation = config['isolation']
+        self.timeout = isolation['timeout']
+        self.max_backoff = isolation['max_backoff']
+        self.ring = FrameRing(isolation['slots'], isolation['max_frame'])
+
+        # Детектор и классификатор живут в дочернем процессе
+        self.detector = None
+        self.classifier = None
+        self.ready = threading.Event()
+        self.error = None
+        self.load_times = {}
+        self.restarts = 0
+
+        self._lock = threading.Lock()
+        self._process = None
+        self._conn = None
+        # Размер входа детектора задается без блокировки и передается в
+        # процесс перед следующим запросом, если отличается от переданного
+        self._input_size = None
+        self._sent_input_size = None
+        self._last_frame = None
+        self._stop_event = threading.Event()
+        self._supervisor = threading.Thread(target=self._supervise, name='worker-supervisor',
+                                            daemon=True)
+
+    def _spawn(self):
+        parent, child = CONTEXT.Pipe()
+        process = CONTEXT.Process(
+            target=_worker_main, name='emotion-worker', daemon=True,
+            args=(child, self.ring.name, self.ring.slots, self.ring.max_frame, self.config))
+        process.start()
+        child.close()
+
+        # Загрузка моделей в дочернем процессе занимает секунды
+        try:
+            while not parent.poll(0.5):
+                if not process.is_alive() or self._stop_event.is_set():
+                    raise EOFError()
+            status, payload = parent.recv()
+        except (EOFError, OSError):
+            # Процесс упал при запуске: poll видит закрытый канал, recv - EOF
+            parent.close()
+            process.join(0.1)
+            if process.is_alive():
+                process.kill()
+            raise WorkerError(f"Процесс анализа завершился при запуске ({process.exitcode})")
+        if status != 'ready':
+            parent.close()
+            process.join(1.0)
+            raise WorkerError(payload)
+
+        self._process, self._conn = process, parent
+        self._last_frame = None
+        self._sent_input_size = None
+        self.load_times = payload
+
+    def load(self, progress=None):
+        progress = progress or (lambda text, fraction: None)
+        progress("Запуск процесса анализа...", 0.1)
+        try:
+            with self._lock:
+                self._spawn()
+        except Exception as e:
+            self.error = e
+            self.ring.close()
+            raise
+        progress("Модели готовы", 1.0)
+        self.ready.set()
+        self._supervisor.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self.ready.clear()
+        with self._lock:
+            if self._conn:
+                try:
+                    self._conn.send(('stop', None))
+                except (OSError, ValueError):
+                    pass
+            if self._process:
+                self._process.join(1.0)
+                if self._process.is_alive():
+                    self._process.kill()
+            self.ring.close()
+
+    def _supervise(self):
+        backoff = 1.0
+        while not self._stop_event.wait(0.5):
+            if self._process.is_alive():
+                backoff = 1.0
+                continue
+
+            self.ready.clear()
+            print(f"Процесс анализа завершился ({self._process.exitcode}), перезапуск...")
+            while not self._stop_event.is_set():
+                try:
+                    with self._lock:
+                        self._spawn()
+                    break
+                except Exception as e:
+                    print(f"Не удалось перезапустить процесс анализа: {str(e)}")
+                    self._stop_event.wait(backoff)
+                    backoff = min(backoff * 2, self.max_backoff)
+            if not self._stop_event.is_set():
+                self.restarts += 1
+                self.ready.set()
+
+    def _request(self, command, args):
+        # Вызывается под self._lock; сначала догоняется размер входа детектора
+        input_size = self._input_size
+        if input_size is not None and input_size != self._sent_input_size:
+            self._call('input_size', input_size)
+            self._sent_input_size = input_size
+        return self._call(command, args)
+
+    def _call(self, command, args):
+        # Вызывается под self._lock
+        try:
+            self._conn.send((command, args))
+            if not self._conn.poll(self.timeout):
+                raise WorkerError("Процесс анализа не ответил вовремя")
+            status, reply = self._conn.recv()
+        except (EOFError, OSError, WorkerError):
+            # Завис или упал: супервизор перезапустит процесс
+            self.ready.clear()
+            if self._process.is_alive():
+                self._process.kill()
+            raise WorkerError("Процесс анализа недоступен")
+        if status != 'ok':
+            raise WorkerError(reply)
+        return reply
+
+    def _write(self, frame):
+        # Кадр, уже переданный для детекции, повторно не копируется
+        if self._last_frame is not None and self._last_frame[0] is frame:
+            return self._last_frame[1]
+        location = self.ring.write(frame)
+        self._last_frame = (frame, location)
+        return location
+
+    def set_detector_input(self, input_size):
+        # Поток камеры не ждет ни текущего анализа, ни перезапуска процесса
+        self._input_size = tuple(input_size)
+
+    def detect(self, frame):
+        with self._lock:
+            return self._request('detect', self._write(frame))
+
+    def classify_regions(self, frame, boxes):
+        with self._lock:
+            slot, shape = self._write(frame)
+            return self._request('classify', (slot, shape, np.asarray(boxes, dtype=np.int32)))
+
+    def analyze_batch(self, frames, max_faces=None):
+        if len(frames) > self.ring.slots:
+            raise WorkerError(f"Батч больше кольца кадров ({self.ring.slots})")
+        with self._lock:
+            self._last_frame = None
+            locations = [self.ring.write(frame) for frame in frames]
+            return self._request('analyze', (locations, max_faces))